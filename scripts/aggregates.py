@@ -0,0 +1,369 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sketches import HyperLogLog, SpaceSaving
+
+GROUP_COLUMNS = ("category", "ad_keywords")
+METRIC_COLUMN = "activity"
+SEGMENT_COLUMN = "category"
+# Undated data is bucketed by record position: at most TIMELINE_BUCKETS buckets
+# per dataset, each MIN_BUCKET_ROWS rows doubled as often as that needs.
+TIMELINE_BUCKETS = 60
+MIN_BUCKET_ROWS = 200
+# Sketch mode keeps only heavy hitters for this column and estimates
+# distinct counts for DISTINCT_COLUMNS with HyperLogLog.
+SKETCH_COLUMN = "ad_keywords"
+DISTINCT_COLUMNS = ("user_id", "ad_keywords")
+
+
+@dataclass
+class GroupStats:
+    column: str
+    # indexed by group value; columns: count, sum, sum_sq, mean, std
+    table: pd.DataFrame
+
+    @property
+    def unique(self) -> int:
+        return len(self.table)
+
+    def counts(self) -> pd.Series:
+        return self.table["count"].sort_values(ascending=False, kind="stable")
+
+    def top_counts(self, k: int) -> pd.Series:
+        return self.counts().head(k)
+
+    def rates(self, min_count: int = 0) -> pd.Series:
+        table = self.table[self.table["count"] >= min_count] if min_count else self.table
+        return table["mean"].sort_values(ascending=False)
+
+    def top_rates(self, k: int) -> pd.Series:
+        return self.rates().head(k)
+
+
+@dataclass
+class DatasetAggregates:
+    row_count: int
+    columns: List[str]
+    activity_rows: int = 0
+    activity_sum: Optional[float] = None
+    activity_mean: Optional[float] = None
+    groups: Dict[str, GroupStats] = field(default_factory=dict)
+    numeric_column: Optional[str] = None
+    numeric_series: Optional[pd.Series] = None
+    # record position of the first row; "record" buckets are labelled by the
+    # global position their rows start at
+    first_row: int = 0
+    # indexed by (segment, bucket); columns: count, sum
+    timeline: Optional[pd.DataFrame] = None
+    # "date" buckets are calendar days, "record" buckets are row positions
+    timeline_kind: Optional[str] = None
+    # dated data only: indexed by (dimension, value, day); columns: count, sum
+    daily: Optional[pd.DataFrame] = None
+    # indexed by GROUP_COLUMNS pairs; columns: count, and sum/sum_sq with a metric
+    cube: Optional[pd.DataFrame] = None
+    # flagged timeline cells, filled once by anomalies.find_anomalies
+    anomalies: Optional[pd.DataFrame] = None
+    keyword_sketch: Optional[SpaceSaving] = None
+    distinct: Dict[str, HyperLogLog] = field(default_factory=dict)
+
+    @property
+    def has_activity(self) -> bool:
+        return self.activity_sum is not None
+
+    def group(self, column: str) -> Optional[GroupStats]:
+        return self.groups.get(column)
+
+    def unique(self, column: str) -> Optional[int]:
+        if column in self.distinct:
+            return int(round(self.distinct[column].estimate()))
+        stats = self.group(column)
+        return stats.unique if stats is not None else None
+
+
+def _derive_moments(table: pd.DataFrame) -> pd.DataFrame:
+    if "sum" not in table.columns:
+        return table
+    count = table["count"]
+    table["mean"] = table["sum"] / count
+    variance = (table["sum_sq"] - table["sum"] ** 2 / count) / (count - 1)
+    table["std"] = np.sqrt(variance.clip(lower=0)).where(count > 1)
+    return table
+
+
+def group_stats_from_partials(column: str, table: pd.DataFrame) -> GroupStats:
+    # table holds additive partials (count, and sum/sum_sq when a metric exists)
+    table.index.name = column
+    return GroupStats(column, _derive_moments(table))
+
+
+PARTIAL_COLUMNS = ("count", "sum", "sum_sq")
+
+
+def _partials(df: pd.DataFrame, keys: List[str], has_activity: bool) -> pd.DataFrame:
+    # count per key, plus sum/sum_sq of the metric when there is one
+    if not has_activity:
+        return pd.DataFrame({"count": df.groupby(keys, observed=True).size()})
+    # float64 keeps sums of squares clear of downcast integer overflow
+    metric = df[METRIC_COLUMN].astype("float64")
+    grouped = df[keys].assign(sum=metric, sum_sq=metric * metric).groupby(keys, observed=True)
+    table = grouped[["sum", "sum_sq"]].sum()
+    table.insert(0, "count", grouped.size())
+    return table
+
+
+def _merge_partials(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+    # Only the columns both sides carry can be added up.
+    additive = [col for col in PARTIAL_COLUMNS if col in left.columns]
+    if additive != [col for col in PARTIAL_COLUMNS if col in right.columns]:
+        additive = ["count"]
+    stacked = pd.concat([left[additive], right[additive]])
+    return stacked.groupby(level=list(range(left.index.nlevels))).sum()
+
+
+def _group_stats(df: pd.DataFrame, column: str, has_activity: bool) -> GroupStats:
+    return group_stats_from_partials(column, _partials(df, [column], has_activity))
+
+
+def _cube(df: pd.DataFrame, has_activity: bool) -> Optional[pd.DataFrame]:
+    if not all(column in df.columns for column in GROUP_COLUMNS):
+        return None
+    return _partials(df, list(GROUP_COLUMNS), has_activity)
+
+
+def record_bucket_rows(row_count: int) -> int:
+    # Every size is MIN_BUCKET_ROWS times a power of two, so the buckets for
+    # any prefix of the rows nest exactly inside the buckets for all of them.
+    size = MIN_BUCKET_ROWS
+    while size * TIMELINE_BUCKETS < row_count:
+        size *= 2
+    return size
+
+
+def timeline_from_partials(frame: pd.DataFrame) -> pd.DataFrame:
+    grouped = frame.groupby(["segment", "bucket"], observed=True)["metric"]
+    return grouped.agg(["size", "sum"]).rename(columns={"size": "count"})
+
+
+def _date_column(df: pd.DataFrame) -> Optional[str]:
+    return next(
+        (col for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])), None
+    )
+
+
+def _timeline(
+    df: pd.DataFrame, first_row: int = 0
+) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    if SEGMENT_COLUMN not in df.columns or METRIC_COLUMN not in df.columns:
+        return None, None
+    date_col = _date_column(df)
+    if date_col is not None:
+        bucket = df[date_col].dt.floor("D").to_numpy()
+        kind = "date"
+    else:
+        # sized by the rows seen so far; merges coarsen to the final size
+        size = record_bucket_rows(first_row + len(df))
+        bucket = np.arange(first_row, first_row + len(df)) // size * size
+        kind = "record"
+    frame = pd.DataFrame(
+        {
+            "segment": df[SEGMENT_COLUMN].to_numpy(),
+            "bucket": bucket,
+            "metric": df[METRIC_COLUMN].astype("float64").to_numpy(),
+        }
+    )
+    return timeline_from_partials(frame), kind
+
+
+def _daily(df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    date_col = _date_column(df)
+    columns = [column for column in GROUP_COLUMNS if column in df.columns]
+    if date_col is None or METRIC_COLUMN not in df.columns or not columns:
+        return None
+    day = df[date_col].dt.floor("D").to_numpy()
+    metric = df[METRIC_COLUMN].astype("float64").to_numpy()
+    tables = []
+    for column in columns:
+        frame = pd.DataFrame(
+            {"value": df[column].astype(str).to_numpy(), "day": day, "metric": metric}
+        )
+        grouped = frame.groupby(["value", "day"])["metric"]
+        tables.append(grouped.agg(["size", "sum"]).rename(columns={"size": "count"}))
+    return pd.concat(tables, keys=columns, names=["dimension"])
+
+
+def _coarsen_timeline(timeline: pd.DataFrame, row_count: int) -> pd.DataFrame:
+    buckets = timeline.index.get_level_values("bucket")
+    size = record_bucket_rows(row_count)
+    coarse = buckets // size * size
+    segments = timeline.index.get_level_values("segment")
+    return timeline.groupby([segments, coarse]).sum().rename_axis(["segment", "bucket"])
+
+
+def _merge_timeline(left: DatasetAggregates, right: DatasetAggregates) -> Optional[pd.DataFrame]:
+    record = "record" in (left.timeline_kind, right.timeline_kind)
+    parts = [] if left.timeline is None else [left.timeline]
+    if right.timeline is not None:
+        shifted = right.timeline
+        # Right's rows follow left's. Chunks aggregated with their offset are
+        # labelled already; independently aggregated files are moved along.
+        shift = left.first_row + left.row_count - right.first_row
+        if record and shift:
+            shifted = right.timeline.copy(deep=False)
+            shifted.index = shifted.index.set_levels(
+                shifted.index.levels[1] + shift, level="bucket"
+            )
+        parts.append(shifted)
+    if not parts:
+        return None
+    merged = pd.concat(parts).groupby(level=[0, 1]).sum() if len(parts) > 1 else parts[0]
+    if record:
+        merged = _coarsen_timeline(merged, left.first_row + left.row_count + right.row_count)
+    return merged
+
+
+def _envelope(series: pd.Series) -> pd.Series:
+    # Keeps only the extreme points of a chunk so streamed runs stay bounded
+    # while the spikes remain visible in the record-index chart.
+    if len(series) <= 2:
+        return series
+    points = sorted({series.idxmin(), series.idxmax()})
+    return series.loc[points]
+
+
+def _sketched_group(sketch: SpaceSaving, has_activity: bool) -> GroupStats:
+    partials = sketch.partials()
+    return group_stats_from_partials(
+        SKETCH_COLUMN, partials if has_activity else partials[["count"]]
+    )
+
+
+def _apply_sketches(aggregates: DatasetAggregates, df: pd.DataFrame, capacity: int) -> None:
+    stats = aggregates.group(SKETCH_COLUMN)
+    if stats is not None:
+        aggregates.keyword_sketch = SpaceSaving.from_partials(stats.table, capacity)
+        aggregates.groups[SKETCH_COLUMN] = _sketched_group(
+            aggregates.keyword_sketch, aggregates.has_activity
+        )
+    for column in DISTINCT_COLUMNS:
+        if column in df.columns:
+            aggregates.distinct[column] = HyperLogLog.from_values(df[column])
+    if aggregates.daily is not None:
+        dimensions = aggregates.daily.index.get_level_values("dimension")
+        aggregates.daily = aggregates.daily[dimensions != SKETCH_COLUMN]
+    # the cube is exact per keyword, which is what sketch mode avoids keeping
+    aggregates.cube = None
+
+
+def build_aggregates(
+    df: pd.DataFrame, sketch_capacity: Optional[int] = None, first_row: int = 0
+) -> DatasetAggregates:
+    # first_row places a chunk within the whole dataset for the record timeline.
+    has_activity = METRIC_COLUMN in df.columns
+    aggregates = DatasetAggregates(
+        row_count=len(df), columns=df.columns.tolist(), first_row=first_row
+    )
+
+    if has_activity:
+        activity = df[METRIC_COLUMN].astype("float64")
+        aggregates.activity_rows = len(activity)
+        aggregates.activity_sum = float(activity.sum())
+        aggregates.activity_mean = aggregates.activity_sum / len(activity) if len(activity) else 0.0
+
+    for column in GROUP_COLUMNS:
+        if column in df.columns:
+            aggregates.groups[column] = _group_stats(df, column, has_activity)
+
+    numeric_cols = df.select_dtypes(include="number").columns.tolist()
+    if numeric_cols:
+        aggregates.numeric_column = numeric_cols[0]
+        aggregates.numeric_series = df[numeric_cols[0]]
+
+    aggregates.timeline, aggregates.timeline_kind = _timeline(df, first_row)
+    aggregates.daily = _daily(df)
+    aggregates.cube = _cube(df, has_activity)
+    if sketch_capacity:
+        _apply_sketches(aggregates, df, sketch_capacity)
+    return aggregates
+
+
+def _merge_group(left: GroupStats, right: GroupStats) -> GroupStats:
+    return group_stats_from_partials(left.column, _merge_partials(left.table, right.table))
+
+
+def merge_aggregates(left: DatasetAggregates, right: DatasetAggregates) -> DatasetAggregates:
+    row_count = left.row_count + right.row_count
+    columns = left.columns + [col for col in right.columns if col not in left.columns]
+    merged = DatasetAggregates(row_count=row_count, columns=columns, first_row=left.first_row)
+
+    if left.has_activity or right.has_activity:
+        merged.activity_rows = left.activity_rows + right.activity_rows
+        merged.activity_sum = (left.activity_sum or 0.0) + (right.activity_sum or 0.0)
+        merged.activity_mean = (
+            merged.activity_sum / merged.activity_rows if merged.activity_rows else 0.0
+        )
+
+    for column in GROUP_COLUMNS:
+        lhs, rhs = left.group(column), right.group(column)
+        if lhs is not None and rhs is not None:
+            merged.groups[column] = _merge_group(lhs, rhs)
+        elif lhs is not None or rhs is not None:
+            merged.groups[column] = lhs or rhs
+
+    merged.numeric_column = left.numeric_column or right.numeric_column
+    # Record positions continue across merges: right's rows follow left's.
+    series = []
+    for agg, offset in ((left, 0), (right, left.row_count)):
+        if agg.numeric_series is not None and agg.numeric_column == merged.numeric_column:
+            shifted = agg.numeric_series.copy(deep=False)
+            shifted.index = shifted.index + offset
+            series.append(shifted)
+    if series:
+        merged.numeric_series = pd.concat(series) if len(series) > 1 else series[0]
+
+    merged.timeline_kind = left.timeline_kind or right.timeline_kind
+    if left.timeline_kind == right.timeline_kind or None in (left.timeline_kind, right.timeline_kind):
+        merged.timeline = _merge_timeline(left, right)
+    else:
+        merged.timeline = left.timeline
+        merged.timeline_kind = left.timeline_kind
+    if left.daily is not None and right.daily is not None:
+        merged.daily = pd.concat([left.daily, right.daily]).groupby(level=[0, 1, 2]).sum()
+    else:
+        merged.daily = left.daily if right.daily is None else right.daily
+    if left.cube is not None and right.cube is not None:
+        merged.cube = _merge_partials(left.cube, right.cube)
+    else:
+        merged.cube = left.cube if right.cube is None else right.cube
+
+    if left.keyword_sketch is not None and right.keyword_sketch is not None:
+        merged.keyword_sketch = left.keyword_sketch.merge(right.keyword_sketch)
+        merged.groups[SKETCH_COLUMN] = _sketched_group(
+            merged.keyword_sketch, merged.has_activity
+        )
+    else:
+        merged.keyword_sketch = left.keyword_sketch or right.keyword_sketch
+    merged.distinct = dict(left.distinct)
+    for column, sketch in right.distinct.items():
+        merged.distinct[column] = (
+            merged.distinct[column].merge(sketch) if column in merged.distinct else sketch
+        )
+    return merged
+
+
+def accumulate_aggregates(
+    chunks: Iterable[pd.DataFrame], sketch_capacity: Optional[int] = None, first_row: int = 0
+) -> Optional[DatasetAggregates]:
+    total: Optional[DatasetAggregates] = None
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        chunk.index = pd.RangeIndex(len(chunk))
+        partial = build_aggregates(chunk, sketch_capacity, first_row)
+        first_row += len(chunk)
+        if partial.numeric_series is not None:
+            partial.numeric_series = _envelope(partial.numeric_series)
+        total = partial if total is None else merge_aggregates(total, partial)
+    return total
@@ -0,0 +1,98 @@
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from aggregates import DatasetAggregates
+
+DEFAULT_WINDOW = 7
+DEFAULT_THRESHOLD = 3.0
+# Segment/bucket cells with fewer rows than this are too noisy to score.
+MIN_BUCKET_VOLUME = 10
+MAD_SCALE = 1.4826
+METHODS = ("zscore", "mad")
+
+
+def segment_rates(
+    aggregates: DatasetAggregates, min_volume: int = MIN_BUCKET_VOLUME
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # buckets as rows, segments as columns, so every rolling op below runs
+    # across all segments at once
+    table = aggregates.timeline
+    if table is None or table.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    rate = (table["sum"] / table["count"]).where(table["count"] >= min_volume)
+    wide = rate.unstack(level="segment").sort_index()
+    counts = table["count"].unstack(level="segment").reindex_like(wide)
+    return wide, counts
+
+
+def detect_anomalies(
+    aggregates: DatasetAggregates,
+    window: int = DEFAULT_WINDOW,
+    threshold: float = DEFAULT_THRESHOLD,
+    method: str = "zscore",
+    min_volume: int = MIN_BUCKET_VOLUME,
+) -> pd.DataFrame:
+    if method not in METHODS:
+        raise ValueError(f"Unknown anomaly method: {method}")
+    wide, counts = segment_rates(aggregates, min_volume)
+    columns = ["segment", "bucket", "rate", "baseline", "change_pct", "score"]
+    if wide.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Each bucket is compared with the trailing window before it.
+    history = wide.shift(1).rolling(window, min_periods=min(3, window))
+    if method == "mad":
+        baseline = history.median()
+        deviation = (wide.shift(1) - baseline).abs()
+        spread = deviation.rolling(window, min_periods=min(3, window)).median() * MAD_SCALE
+    else:
+        baseline = history.mean()
+        spread = history.std()
+    # A bucket's rate cannot be more precise than its sampling noise, which
+    # keeps thin or unusually steady histories from producing huge scores.
+    sampling = np.sqrt((baseline * (1 - baseline)).clip(lower=0) / counts)
+    spread = np.fmax(spread, sampling)
+    score = (wide - baseline) / spread.where(spread > 0)
+
+    long = pd.DataFrame(
+        {
+            "rate": wide.stack(),
+            "baseline": baseline.stack(),
+            "score": score.stack(),
+        }
+    ).dropna()
+    flagged = long[long["score"].abs() >= threshold].copy()
+    flagged["change_pct"] = (
+        (flagged["rate"] - flagged["baseline"]) / flagged["baseline"].where(flagged["baseline"] > 0)
+    ) * 100
+    flagged = flagged.reset_index().rename(columns={"level_1": "segment"})
+    order = np.argsort(-flagged["score"].abs().to_numpy(), kind="stable")
+    return flagged.iloc[order][columns].reset_index(drop=True)
+
+
+def find_anomalies(aggregates: DatasetAggregates) -> pd.DataFrame:
+    # Insights, prompts and charts all report the default detection, so it runs
+    # once per aggregates and is kept on them.
+    if aggregates.anomalies is None:
+        aggregates.anomalies = detect_anomalies(aggregates)
+    return aggregates.anomalies
+
+
+def describe_anomalies(
+    anomalies: pd.DataFrame, timeline_kind: str, limit: int = 3
+) -> List[str]:
+    lines: List[str] = []
+    for row in anomalies.head(limit).itertuples(index=False):
+        direction = "dropped" if row.score < 0 else "spiked"
+        if pd.notna(row.change_pct):
+            movement = f"{direction} {abs(row.change_pct):.0f}%"
+        else:
+            movement = direction
+        if timeline_kind == "date":
+            when = f"on {pd.Timestamp(row.bucket):%d %b}"
+        else:
+            when = f"around record {int(row.bucket):,}"
+        lines.append(f"Activity rate {movement} in {row.segment} {when}.")
+    return lines
@@ -0,0 +1,122 @@
+import hashlib
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from aggregates import DatasetAggregates, build_aggregates
+from charts import STYLE, generate_charts
+from insights import InsightSections, generate_llm_insights_batch
+from prompts import DEFAULT_PROMPT_TOKENS, PromptUsage
+from providers import DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT, InsightProvider, ResponseCache
+from renderers import write_reports
+from report import build_report_model
+
+
+def partition_slug(value: object) -> str:
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(value)).strip("._")
+    return slug or "unnamed"
+
+
+def partition_slugs(values: List[object]) -> List[str]:
+    # One directory name per partition value. Values whose slugs coincide
+    # ("A B" and "A/B", or names differing only in case on case-insensitive
+    # filesystems) each get a short hash of the value, so no report overwrites
+    # another's. Every name that differs from its value is logged.
+    slugs = [partition_slug(value) for value in values]
+    shared = Counter(slug.lower() for slug in slugs)
+    unique: List[str] = []
+    taken = set()
+    for value, slug in zip(values, slugs):
+        if shared[slug.lower()] > 1:
+            tag = hashlib.sha256(str(value).encode("utf-8")).hexdigest()[:8]
+            slug = f"{slug}-{tag}"
+        base, count = slug, 1
+        while slug.lower() in taken:
+            count += 1
+            slug = f"{base}-{count}"
+        taken.add(slug.lower())
+        unique.append(slug)
+        if slug != str(value):
+            print(f"[BATCH] Partition {str(value)!r} -> {slug}/")
+    return unique
+
+
+def _warm_worker() -> None:
+    # Resolve the chart font once per worker instead of once per partition.
+    from matplotlib import font_manager
+
+    font_manager.findfont(STYLE["font.family"])
+
+
+def _render_partition(
+    aggregates: DatasetAggregates, insights: InsightSections, output_dir: Path
+) -> Dict[str, Path]:
+    charts = generate_charts(aggregates, output_dir=output_dir / "charts")
+    return write_reports(build_report_model(insights, charts), output_dir)
+
+
+def run_batch(
+    cleaned_df: pd.DataFrame,
+    column: str,
+    output_root: Path,
+    workers: int = 1,
+    provider: Optional[InsightProvider] = None,
+    llm_cache: Optional[ResponseCache] = None,
+    llm_timeout: float = DEFAULT_TIMEOUT,
+    token_budget: int = DEFAULT_PROMPT_TOKENS,
+    usages: Optional[List[PromptUsage]] = None,
+) -> List[Path]:
+    if column not in cleaned_df.columns:
+        print(f"[ERROR] Partition column '{column}' not found in dataset.")
+        return []
+
+    print(f"[BATCH] Aggregating partitions by {column}")
+    values: List[object] = []
+    batch: List[DatasetAggregates] = []
+    for value, partition in cleaned_df.groupby(column, observed=True, sort=True):
+        values.append(value)
+        batch.append(build_aggregates(partition))
+    keys = partition_slugs(values)
+
+    print(f"[INSIGHT] Generating insights for {len(batch)} partitions")
+    insights = generate_llm_insights_batch(
+        batch,
+        provider,
+        llm_cache,
+        concurrency=DEFAULT_CONCURRENCY,
+        timeout=llm_timeout,
+        token_budget=token_budget,
+        usages=usages,
+    )
+
+    print(f"[REPORT] Rendering {len(batch)} partition reports with {workers} workers")
+    output_dirs = [output_root / key for key in keys]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker) as pool:
+            futures = [
+                pool.submit(_render_partition, aggregates, sections, output_dir)
+                for aggregates, sections, output_dir in zip(batch, insights, output_dirs)
+            ]
+            outcomes = [future.exception() for future in futures]
+    else:
+        outcomes = []
+        for aggregates, sections, output_dir in zip(batch, insights, output_dirs):
+            try:
+                _render_partition(aggregates, sections, output_dir)
+                outcomes.append(None)
+            except Exception as e:
+                outcomes.append(e)
+
+    written: List[Path] = []
+    for key, output_dir, error in zip(keys, output_dirs, outcomes):
+        if error is None:
+            written.append(output_dir)
+        else:
+            print(f"[WARN] Report for partition {key} failed: {error}")
+
+    print(f"Batch completed: {len(written)}/{len(keys)} reports under {output_root}")
+    return written
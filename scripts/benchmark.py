@@ -0,0 +1,188 @@
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from aggregates import build_aggregates
+from charts import generate_charts
+from generate_pdf import build_pdf
+from generate_slides import build_presentation
+from insights import _fallback_insights
+from synthetic import DEFAULT_CATEGORIES, DEFAULT_KEYWORDS, DEFAULT_SKEW, write_synthetic_csv
+from utils import clean_data, load_csv
+
+BENCH_DIR = Path("data") / "benchmarks"
+RESULTS_PATH = BENCH_DIR / "results.jsonl"
+DEFAULT_SCALES = (10_000, 100_000, 1_000_000)
+SCRIPTS_DIR = Path(__file__).resolve().parent
+# Fresh interpreters, so these time imports and CLI start-up as a user sees them.
+COLD_START_COMMANDS = {
+    "pipeline_help": ["pipeline.py", "--help"],
+    "import_pipeline": ["-c", "import pipeline"],
+    "import_charts": ["-c", "import charts"],
+    "import_renderers": ["-c", "import renderers"],
+}
+
+
+def _git_revision() -> str:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return result.stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_cold_start(repeat: int = 3) -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    for name, command in COLD_START_COMMANDS.items():
+        timings[name] = _best_of(
+            lambda: subprocess.run(
+                [sys.executable, *command], cwd=SCRIPTS_DIR, capture_output=True, check=True
+            ),
+            repeat,
+        )
+    return timings
+
+
+def _dataset_dir(rows: int, keywords: int, categories: int, skew: float) -> Path:
+    folder = BENCH_DIR / "input" / f"rows{rows}_kw{keywords}_cat{categories}_skew{skew:g}"
+    if not (folder / "synthetic.csv").exists():
+        print(f"[BENCH] Generating {rows:,} synthetic rows")
+        write_synthetic_csv(
+            folder / "synthetic.csv", rows, keywords=keywords, categories=categories, skew=skew
+        )
+    return folder
+
+
+def bench_scale(
+    rows: int,
+    keywords: int = DEFAULT_KEYWORDS,
+    categories: int = DEFAULT_CATEGORIES,
+    skew: float = DEFAULT_SKEW,
+    repeat: int = 3,
+) -> Dict[str, float]:
+    folder = _dataset_dir(rows, keywords, categories, skew)
+    timings: Dict[str, float] = {}
+
+    raw = load_csv(folder)
+    timings["load_csv"] = _best_of(lambda: load_csv(folder), repeat)
+    cleaned = clean_data(raw)
+    timings["clean_data"] = _best_of(lambda: clean_data(raw), repeat)
+    aggregates = build_aggregates(cleaned)
+    timings["build_aggregates"] = _best_of(lambda: build_aggregates(cleaned), repeat)
+    insights = _fallback_insights(aggregates)
+    timings["_fallback_insights"] = _best_of(lambda: _fallback_insights(aggregates), repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        # the chart cache is bypassed so every repeat measures a full render
+        charts = generate_charts(aggregates, output_dir=out / "charts", cache_dir=None)
+        timings["generate_charts"] = _best_of(
+            lambda: generate_charts(aggregates, output_dir=out / "charts", cache_dir=None),
+            repeat,
+        )
+        timings["build_pdf"] = _best_of(
+            lambda: build_pdf(insights, charts, output_path=out / "report.pdf"), repeat
+        )
+        timings["build_presentation"] = _best_of(
+            lambda: build_presentation(insights, charts, output_path=out / "report.pptx"), repeat
+        )
+    return timings
+
+
+def _previous_results(path: Path, revision: str) -> Dict[str, dict]:
+    # latest result per dataset recorded at a different revision
+    previous: Dict[str, dict] = {}
+    if not path.exists():
+        return previous
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record.get("revision") != revision:
+            previous[record["dataset"]] = record
+    return previous
+
+
+def run_benchmarks(
+    scales: Sequence[int] = DEFAULT_SCALES,
+    keywords: int = DEFAULT_KEYWORDS,
+    categories: int = DEFAULT_CATEGORIES,
+    skew: float = DEFAULT_SKEW,
+    repeat: int = 3,
+    results_path: Path = RESULTS_PATH,
+) -> List[dict]:
+    revision = _git_revision()
+    previous = _previous_results(results_path, revision)
+    records: List[dict] = []
+
+    runs = [("cold_start", 0)] + [
+        (f"rows{rows}_kw{keywords}_cat{categories}_skew{skew:g}", rows) for rows in scales
+    ]
+    for dataset, rows in runs:
+        print(f"[BENCH] {dataset}")
+        if rows:
+            timings = bench_scale(rows, keywords, categories, skew, repeat)
+        else:
+            timings = bench_cold_start(repeat)
+        record = {
+            "revision": revision,
+            "recorded": datetime.now().isoformat(timespec="seconds"),
+            "dataset": dataset,
+            "rows": rows,
+            "repeat": repeat,
+            "timings_s": timings,
+        }
+        records.append(record)
+        baseline: Optional[dict] = previous.get(dataset)
+        for name, seconds in timings.items():
+            line = f"  {name:<20} {seconds:9.4f}s"
+            before = baseline["timings_s"].get(name) if baseline else None
+            if before:
+                line += f"  {(seconds - before) / before * 100:+6.1f}% vs {baseline['revision']}"
+            print(line)
+
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(results_path, "a", encoding="utf-8") as handle:
+        for record in records:
+            handle.write(json.dumps(record) + "\n")
+    return records
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark InsightForge stages at several scales")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES))
+    parser.add_argument("--keywords", type=int, default=DEFAULT_KEYWORDS)
+    parser.add_argument("--categories", type=int, default=DEFAULT_CATEGORIES)
+    parser.add_argument("--skew", type=float, default=DEFAULT_SKEW)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--results", type=Path, default=RESULTS_PATH)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    run_benchmarks(
+        args.scales,
+        keywords=args.keywords,
+        categories=args.categories,
+        skew=args.skew,
+        repeat=args.repeat,
+        results_path=args.results,
+    )
@@ -0,0 +1,125 @@
+import hashlib
+import importlib.util
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Union
+
+import pandas as pd
+
+CACHE_DIR = Path("data") / "cache"
+CHART_CACHE_DIR = CACHE_DIR / "charts"
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+# Bump when clean_data changes so stale cleaned frames are not reused.
+CACHE_VERSION = "3"
+CACHE_SUFFIX = ".arrow"
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def _pyarrow():
+    # Loaded on the first cache read or write, so runs that never touch the
+    # cache (--help, insights from SQL) do not pay for the import.
+    import pyarrow as pa  # type: ignore
+
+    return pa
+
+
+@lru_cache(maxsize=1024)
+def _digest(path: str, mtime_ns: int, size: int, block_size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_digest(path: Path, block_size: int = 1 << 20) -> str:
+    # Hashed once per file version: a cache miss asks for the digest in both
+    # get() and put(), and the watcher asks again on every changed stat.
+    info = path.stat()
+    return _digest(str(path.resolve()), info.st_mtime_ns, info.st_size, block_size)
+
+
+class IngestCache:
+    def __init__(
+        self,
+        directory: Union[str, Path] = CACHE_DIR,
+        max_bytes: int = MAX_CACHE_BYTES,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    @property
+    def available(self) -> bool:
+        return HAS_PYARROW
+
+    def _entry(self, path: Path) -> Path:
+        key = f"{CACHE_VERSION}-{file_digest(path)}"
+        return self.directory / f"{key}{CACHE_SUFFIX}"
+
+    def entries(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return list(self.directory.glob(f"*{CACHE_SUFFIX}"))
+
+    def get(self, path: Path) -> Optional[pd.DataFrame]:
+        if not self.available:
+            return None
+        entry = self._entry(path)
+        if not entry.exists():
+            return None
+        pa = _pyarrow()
+        try:
+            with pa.memory_map(str(entry), "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+            df = table.to_pandas()
+        except Exception as e:
+            print(f"[WARN] Discarding unreadable cache entry {entry.name}: {e}")
+            entry.unlink(missing_ok=True)
+            return None
+        # mtime doubles as the last-access time for LRU eviction
+        os.utime(entry)
+        return df
+
+    def put(self, path: Path, df: pd.DataFrame) -> None:
+        if not self.available:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = self._entry(path)
+        tmp = entry.with_suffix(".tmp")
+        pa = _pyarrow()
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with pa.OSFile(str(tmp), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            tmp.replace(entry)
+        except Exception as e:
+            print(f"[WARN] Could not cache {path.name}: {e}")
+            tmp.unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def invalidate(self, path: Optional[Path] = None) -> int:
+        if path is not None:
+            entry = self._entry(path)
+            if entry.exists():
+                entry.unlink()
+                return 1
+            return 0
+        removed = 0
+        for entry in self.entries():
+            entry.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def evict(self) -> int:
+        entries = sorted(self.entries(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        removed = 0
+        while entries and total > self.max_bytes:
+            oldest = entries.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink(missing_ok=True)
+            removed += 1
+        return removed
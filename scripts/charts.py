@@ -1,12 +1,33 @@
+import hashlib
+import io
+import marshal
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Callable, List, Optional
+from typing import Any, Callable, List, Optional, Tuple
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
+import matplotlib
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+from aggregates import DatasetAggregates
+from cache import CHART_CACHE_DIR
+from downsample import downsample_frame, downsample_series
+from anomalies import describe_anomalies, find_anomalies, segment_rates
+from profiling import RunProfiler
+
 OUTPUT_DIR = Path("data") / "output" / "charts"
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+CHART_CACHE_MAX_FILES = 500
+# Bump when shared drawing helpers change so cached PNGs are re-rendered.
+CHART_CACHE_VERSION = "3"
 
 PALETTE = {
     "navy": "#0B2545",
@@ -15,21 +36,24 @@ PALETTE = {
     "violet": "#7F3CFF",
 }
 
-plt.rcParams.update(
-    {
-        "font.family": "DejaVu Sans",
-        "axes.facecolor": "#FFFFFF",
-        "axes.edgecolor": "#EFEFF2",
-        "axes.labelcolor": "#0B2545",
-        "axes.titleweight": "bold",
-        "ytick.color": "#4A4A4A",
-        "xtick.color": "#4A4A4A",
-        "figure.facecolor": "#FFFFFF",
-        "grid.color": "#EFEFF2",
-        "grid.linestyle": "--",
-        "grid.alpha": 0.6,
-    }
-)
+STYLE = {
+    "font.family": "DejaVu Sans",
+    "axes.facecolor": "#FFFFFF",
+    "axes.edgecolor": "#EFEFF2",
+    "axes.labelcolor": "#0B2545",
+    "axes.titleweight": "bold",
+    "ytick.color": "#4A4A4A",
+    "xtick.color": "#4A4A4A",
+    "figure.facecolor": "#FFFFFF",
+    "grid.color": "#EFEFF2",
+    "grid.linestyle": "--",
+    "grid.alpha": 0.6,
+}
+
+FIGSIZE = (8, 4.2)
+DPI = 220
+# Line charts are reduced to what this many pixel columns can show.
+PLOT_WIDTH_PX = int(FIGSIZE[0] * DPI)
 
 
 @dataclass
@@ -37,116 +61,317 @@ class ChartArtifact:
     path: Path
     title: str
     description: str
+    # encoded PNG, so report builders need not read the file back
+    image: Optional[bytes] = None
+
+
+@dataclass
+class ChartSpec:
+    filename: str
+    title: str
+    description: str
+    draw: Callable[[Any], None]
+    # everything the chart plots; together with the style it keys the cache
+    data: Tuple[Any, ...]
+
+
+def _new_axes():
+    fig = Figure(figsize=FIGSIZE, dpi=DPI)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots()
+
 
+def _encode(spec: ChartSpec) -> bytes:
+    fig, ax = _new_axes()
+    spec.draw(ax)
+    fig.tight_layout()
+    fig.canvas.draw()
+    # The canvas buffer carries its own (height, width, 4) shape. Charts are
+    # opaque, so the alpha channel is dropped: PDF writers can then embed the
+    # PNG stream as-is instead of splitting out a soft mask.
+    pixels = np.asarray(fig.canvas.buffer_rgba())
+    buffer = io.BytesIO()
+    Image.fromarray(pixels[..., :3]).save(buffer, format="PNG", dpi=(DPI, DPI))
+    return buffer.getvalue()
 
-def _plot_category_counts(df: pd.DataFrame) -> Optional[ChartArtifact]:
-    if "category" not in df.columns:
+
+def _rotate_xticks(ax) -> None:
+    for label in ax.get_xticklabels():
+        label.set_rotation(20)
+        label.set_horizontalalignment("right")
+
+
+def chart_key(spec: ChartSpec) -> str:
+    digest = hashlib.sha256()
+    style = (
+        CHART_CACHE_VERSION,
+        matplotlib.__version__,
+        sorted(STYLE.items()),
+        sorted(PALETTE.items()),
+        FIGSIZE,
+        DPI,
+        spec.filename,
+        spec.title,
+    )
+    digest.update(repr(style).encode())
+    # the draw function's bytecode and constants cover titles, labels and colours
+    digest.update(marshal.dumps(spec.draw.__code__))
+    for part in spec.data:
+        if isinstance(part, (pd.Series, pd.DataFrame)):
+            digest.update(pd.util.hash_pandas_object(part).to_numpy().tobytes())
+            labels = part.columns if isinstance(part, pd.DataFrame) else [part.name]
+            digest.update(repr((list(labels), part.index.names, str(part.dtypes))).encode())
+        else:
+            digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+
+def _plot_category_counts(aggregates: DatasetAggregates) -> Optional[ChartSpec]:
+    stats = aggregates.group("category")
+    if stats is None:
         return None
-    counts = df["category"].value_counts().sort_values(ascending=False)
+    counts = stats.counts()
     if counts.empty:
         return None
-    plt.figure(figsize=(8, 4.2))
-    counts.plot(kind="bar", color=PALETTE["navy"])
-    plt.title("Events by Category")
-    plt.xlabel("Category")
-    plt.ylabel("Volume")
-    plt.xticks(rotation=20, ha="right")
-    plt.tight_layout()
-    path = OUTPUT_DIR / "events_by_category.png"
-    plt.savefig(path, dpi=220)
-    plt.close()
+
+    def draw(ax) -> None:
+        counts.plot(kind="bar", color=PALETTE["navy"], ax=ax)
+        ax.set_title("Events by Category")
+        ax.set_xlabel("Category")
+        ax.set_ylabel("Volume")
+        _rotate_xticks(ax)
+
     top_cat = counts.index[0]
     description = (
         f"{top_cat} leads in engagement volume, contributing "
         f"{counts.iloc[0]:,} logged interactions across the period."
     )
-    return ChartArtifact(path, "Events by Category", description)
+    return ChartSpec("events_by_category.png", "Events by Category", description, draw, (counts,))
 
 
-def _plot_category_conversion(df: pd.DataFrame) -> Optional[ChartArtifact]:
-    if "category" not in df.columns or "activity" not in df.columns:
+def _plot_category_conversion(aggregates: DatasetAggregates) -> Optional[ChartSpec]:
+    stats = aggregates.group("category")
+    if stats is None or not aggregates.has_activity:
         return None
-    conv = df.groupby("category")["activity"].mean().sort_values(ascending=False) * 100
+    conv = stats.rates() * 100
     if conv.empty:
         return None
-    plt.figure(figsize=(8, 4.2))
-    conv.plot(kind="bar", color=PALETTE["teal"])
-    plt.title("Activity Rate by Category (%)")
-    plt.xlabel("Category")
-    plt.ylabel("Active Share (%)")
-    plt.xticks(rotation=20, ha="right")
-    plt.tight_layout()
-    path = OUTPUT_DIR / "activity_rate_by_category.png"
-    plt.savefig(path, dpi=220)
-    plt.close()
+
+    def draw(ax) -> None:
+        conv.plot(kind="bar", color=PALETTE["teal"], ax=ax)
+        ax.set_title("Activity Rate by Category (%)")
+        ax.set_xlabel("Category")
+        ax.set_ylabel("Active Share (%)")
+        _rotate_xticks(ax)
+
     best_cat = conv.index[0]
     description = (
         f"{best_cat} converts {conv.iloc[0]:.1f}% of impressions into active sessions; "
         f"median segment trails at {conv.median():.1f}%."
     )
-    return ChartArtifact(path, "Activity Rate by Category", description)
+    return ChartSpec(
+        "activity_rate_by_category.png", "Activity Rate by Category", description, draw, (conv,)
+    )
 
 
-def _plot_top_keywords(df: pd.DataFrame, top_n: int = 10) -> Optional[ChartArtifact]:
-    if "ad_keywords" not in df.columns:
+def _plot_top_keywords(aggregates: DatasetAggregates, top_n: int = 10) -> Optional[ChartSpec]:
+    stats = aggregates.group("ad_keywords")
+    if stats is None:
         return None
-    counts = df["ad_keywords"].value_counts().head(top_n)
+    counts = stats.top_counts(top_n)
     if counts.empty:
         return None
-    plt.figure(figsize=(8, 4.2))
-    counts.plot(kind="bar", color=PALETTE["gold"])
-    plt.title(f"Top {top_n} Performing Keywords")
-    plt.xlabel("Keyword")
-    plt.ylabel("Volume")
-    plt.xticks(rotation=20, ha="right")
-    plt.tight_layout()
-    path = OUTPUT_DIR / "top_ad_keywords.png"
-    plt.savefig(path, dpi=220)
-    plt.close()
+
+    def draw(ax) -> None:
+        counts.plot(kind="bar", color=PALETTE["gold"], ax=ax)
+        ax.set_title(f"Top {top_n} Performing Keywords")
+        ax.set_xlabel("Keyword")
+        ax.set_ylabel("Volume")
+        _rotate_xticks(ax)
+
     description = (
         f"'{counts.index[0]}' is the highest-traction creative keyword with "
         f"{counts.iloc[0]:,} logged engagements."
     )
-    return ChartArtifact(path, "Top Ad Keywords", description)
+    if aggregates.keyword_sketch is not None:
+        # sketched volumes are lower bounds
+        description += (
+            f" Volumes are estimates, short by at most "
+            f"{aggregates.keyword_sketch.max_error:,.0f} each."
+        )
+    return ChartSpec(
+        "top_ad_keywords.png", "Top Ad Keywords", description, draw, (counts, top_n)
+    )
 
 
-def _plot_numeric_over_index(df: pd.DataFrame) -> Optional[ChartArtifact]:
-    numeric_cols = df.select_dtypes(include="number").columns.tolist()
-    if not numeric_cols:
+def _plot_numeric_over_index(aggregates: DatasetAggregates) -> Optional[ChartSpec]:
+    if aggregates.numeric_series is None:
         return None
-    col = numeric_cols[0]
-    series = df[col]
-    plt.figure(figsize=(8, 4.2))
-    series.plot(kind="line", color=PALETTE["violet"], linewidth=2)
-    plt.title(f"{col.title()} Trajectory")
-    plt.xlabel("Record Index")
-    plt.ylabel(col.title())
-    plt.grid(True, axis="y")
-    plt.tight_layout()
-    path = OUTPUT_DIR / f"{col}_over_index.png"
-    plt.savefig(path, dpi=220)
-    plt.close()
+    col = aggregates.numeric_column
+    # keeps each bucket's extremes, so min, max and idxmax match the full series
+    series = downsample_series(aggregates.numeric_series, PLOT_WIDTH_PX)
+
+    def draw(ax) -> None:
+        series.plot(kind="line", color=PALETTE["violet"], linewidth=2, ax=ax)
+        ax.set_title(f"{col.title()} Trajectory")
+        ax.set_xlabel("Record Index")
+        ax.set_ylabel(col.title())
+        ax.grid(True, axis="y")
+
     description = (
         f"{col.title()} spans {series.min():.0f}-{series.max():.0f} with "
         f"visible inflection around record {series.idxmax()}."
     )
-    return ChartArtifact(path, f"{col.title()} Trajectory", description)
+    return ChartSpec(
+        f"{col}_over_index.png", f"{col.title()} Trajectory", description, draw, (series, col)
+    )
+
+
+def _plot_segment_anomalies(
+    aggregates: DatasetAggregates, max_segments: int = 3
+) -> Optional[ChartSpec]:
+    anomalies = find_anomalies(aggregates)
+    if anomalies.empty:
+        return None
+    wide, _ = segment_rates(aggregates)
+    segments = list(dict.fromkeys(anomalies["segment"]))[:max_segments]
+    rates = downsample_frame(wide[segments] * 100, PLOT_WIDTH_PX)
+    flagged = anomalies[anomalies["segment"].isin(segments)]
+    kind = aggregates.timeline_kind
+
+    def draw(ax) -> None:
+        for segment, color in zip(segments, (PALETTE["navy"], PALETTE["teal"], PALETTE["gold"])):
+            values = rates[segment].to_numpy()
+            ax.plot(rates.index, values, color=color, linewidth=2, label=str(segment))
+        ax.scatter(
+            flagged["bucket"],
+            flagged["rate"] * 100,
+            color=PALETTE["violet"],
+            s=60,
+            zorder=3,
+            label="Anomaly",
+        )
+        ax.set_title("Activity Rate Anomalies by Segment")
+        if kind == "date":
+            ax.set_xlabel("Date")
+            ax.xaxis.set_major_formatter(mdates.DateFormatter("%d %b"))
+            _rotate_xticks(ax)
+        else:
+            ax.set_xlabel("Record Bucket")
+        ax.set_ylabel("Active Share (%)")
+        ax.grid(True, axis="y")
+        ax.legend(loc="best", fontsize=8)
+
+    description = describe_anomalies(anomalies, kind, limit=1)[0]
+    return ChartSpec(
+        "segment_anomalies.png",
+        "Segment Anomalies",
+        description,
+        draw,
+        (rates, flagged[["segment", "bucket", "rate"]], kind),
+    )
 
 
-ChartFunction = Callable[[pd.DataFrame], Optional[ChartArtifact]]
+ChartFunction = Callable[[DatasetAggregates], Optional[ChartSpec]]
 CHART_BUILDERS: List[ChartFunction] = [
     _plot_category_counts,
     _plot_category_conversion,
     _plot_top_keywords,
     _plot_numeric_over_index,
+    _plot_segment_anomalies,
 ]
 
 
-def generate_charts(df: pd.DataFrame) -> List[ChartArtifact]:
+def _cached_image(spec: ChartSpec, cache_dir: Optional[Path]) -> bytes:
+    if cache_dir is None:
+        with matplotlib.rc_context(STYLE):
+            return _encode(spec)
+    entry = cache_dir / f"{chart_key(spec)}.png"
+    try:
+        image = entry.read_bytes()
+        os.utime(entry)
+        return image
+    except OSError:
+        pass
+    with matplotlib.rc_context(STYLE):
+        image = _encode(spec)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # write then rename so parallel workers never read a partial file
+        partial = entry.with_suffix(f".{os.getpid()}.tmp")
+        partial.write_bytes(image)
+        partial.replace(entry)
+    except OSError as e:
+        print(f"[WARN] Could not cache chart {spec.filename}: {e}")
+    return image
+
+
+def _render(
+    builder: ChartFunction,
+    aggregates: DatasetAggregates,
+    output_dir: Path,
+    cache_dir: Optional[Path],
+) -> Tuple[Optional[ChartArtifact], float, float]:
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    artifact = None
+    spec = builder(aggregates)
+    if spec is not None:
+        image = _cached_image(spec, cache_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / spec.filename
+        path.write_bytes(image)
+        artifact = ChartArtifact(path, spec.title, spec.description, image)
+    return artifact, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def evict_chart_cache(
+    cache_dir: Path = CHART_CACHE_DIR, max_files: int = CHART_CACHE_MAX_FILES
+) -> int:
+    if not cache_dir.exists():
+        return 0
+    entries = sorted(cache_dir.glob("*.png"), key=lambda entry: entry.stat().st_mtime)
+    stale = entries[: max(0, len(entries) - max_files)]
+    for entry in stale:
+        entry.unlink(missing_ok=True)
+    return len(stale)
+
+
+def pool_context():
+    # Charts render while the insight thread is running, and forking a
+    # threaded process can hand workers a lock that is never released.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["__main__", "charts"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def generate_charts(
+    aggregates: DatasetAggregates,
+    workers: int = 1,
+    output_dir: Path = OUTPUT_DIR,
+    profiler: Optional[RunProfiler] = None,
+    cache_dir: Optional[Path] = CHART_CACHE_DIR,
+) -> List[ChartArtifact]:
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as pool:
+            futures = [
+                pool.submit(_render, builder, aggregates, output_dir, cache_dir)
+                for builder in CHART_BUILDERS
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [
+            _render(builder, aggregates, output_dir, cache_dir) for builder in CHART_BUILDERS
+        ]
+
     artifacts: List[ChartArtifact] = []
-    for builder in CHART_BUILDERS:
-        artifact = builder(df)
+    for builder, (artifact, wall_s, cpu_s) in zip(CHART_BUILDERS, results):
+        if profiler is not None:
+            profiler.record_chart(builder.__name__, wall_s, cpu_s)
         if artifact is not None:
             artifacts.append(artifact)
+    if cache_dir is not None:
+        evict_chart_cache(cache_dir)
     return artifacts
-
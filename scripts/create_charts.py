@@ -4,7 +4,11 @@ from typing import Iterable, List
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from downsample import minmax_indices
+
 CHART_DIR = Path("data") / "output" / "charts"
+FIGSIZE = (8, 4)
+DPI = 200
 
 
 def _ensure_dir(directory: Path) -> Path:
@@ -37,13 +41,13 @@ def _plot_numeric_summary(df: pd.DataFrame) -> Path | None:
         return None
 
     means = df[numeric_cols].mean().sort_values(ascending=False)
-    plt.figure(figsize=(8, 4))
+    plt.figure(figsize=FIGSIZE)
     means.plot(kind="bar", color="#4FED84")
     plt.title("Average Metrics by Column")
     plt.tight_layout()
 
     output_path = _save_plot("numeric_summary")
-    plt.savefig(output_path, dpi=200)
+    plt.savefig(output_path, dpi=DPI)
     plt.close()
     return output_path
 
@@ -55,10 +59,19 @@ def _plot_time_series(df: pd.DataFrame) -> Path | None:
         return None
 
     metric = numeric_cols[0]
-    time_df = df[[column, metric]].sort_values(column)
-
-    plt.figure(figsize=(8, 4))
-    plt.plot(time_df[column], time_df[metric], marker="o", color="#F6AD55")
+    time_df = df[[column, metric]].dropna(subset=[column]).sort_values(column)
+    # one min and one max per pixel column: same picture, bounded cost
+    keep = minmax_indices(
+        time_df[metric].to_numpy(dtype="float64", na_value=float("nan")),
+        int(FIGSIZE[0] * DPI),
+        time_df[column].to_numpy(),
+    )
+    # markers only while each point is still distinguishable
+    marker = "o" if len(keep) == len(time_df) else None
+    time_df = time_df.iloc[keep]
+
+    plt.figure(figsize=FIGSIZE)
+    plt.plot(time_df[column], time_df[metric], marker=marker, color="#F6AD55")
     plt.title(f"{metric} over Time")
     plt.xlabel(column.title())
     plt.ylabel(metric.title())
@@ -66,7 +79,7 @@ def _plot_time_series(df: pd.DataFrame) -> Path | None:
     plt.tight_layout()
 
     output_path = _save_plot("time_series")
-    plt.savefig(output_path, dpi=200)
+    plt.savefig(output_path, dpi=DPI)
     plt.close()
     return output_path
 
@@ -0,0 +1,191 @@
+import argparse
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from aggregates import GROUP_COLUMNS, DatasetAggregates
+
+CUBE_PATH = Path("data") / "output" / "cube.db"
+# query dimension -> aggregates column; cells are one row per (category, keyword)
+DIMENSIONS = dict(zip(("category", "keyword"), GROUP_COLUMNS))
+ORDERS = ("count", "rate", "sum")
+
+SCHEMA = """
+CREATE TABLE cube (
+    category TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL,
+    sum_sq REAL,
+    PRIMARY KEY (category, keyword)
+) WITHOUT ROWID;
+CREATE INDEX cube_keyword ON cube (keyword, category);
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def write_cube(
+    aggregates: DatasetAggregates, path: Union[str, Path] = CUBE_PATH, source: str = ""
+) -> int:
+    # Replaces the previous cube in one rename, so readers never see a partial one.
+    if aggregates.cube is None:
+        return 0
+    path = Path(path)
+    table = aggregates.cube.reset_index()
+    for column in ("sum", "sum_sq"):
+        if column not in table.columns:
+            table[column] = None  # no activity metric; stored as NULL
+    records = [
+        (str(category), str(keyword), int(count), total, total_sq)
+        for category, keyword, count, total, total_sq in table[
+            [*GROUP_COLUMNS, "count", "sum", "sum_sq"]
+        ].itertuples(index=False, name=None)
+    ]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".tmp")
+    partial.unlink(missing_ok=True)
+    with closing(sqlite3.connect(partial)) as conn:
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO cube VALUES (?, ?, ?, ?, ?)", records)
+        conn.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [
+                ("built", datetime.now().isoformat(timespec="seconds")),
+                ("rows", str(aggregates.row_count)),
+                ("source", source),
+            ],
+        )
+        conn.execute("ANALYZE")
+        conn.commit()
+    partial.replace(path)
+    print(f"[CUBE] Stored {len(records):,} category x keyword cells in {path}")
+    return len(records)
+
+
+def _in_clause(column: str, values: Sequence[str], params: List[object]) -> str:
+    params.extend(str(value) for value in values)
+    return f"{column} IN ({', '.join('?' * len(values))})"
+
+
+class CubeStore:
+    # Read-only queries over a cube written by write_cube; no raw rows involved.
+    def __init__(self, path: Union[str, Path] = CUBE_PATH) -> None:
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self.path.exists():
+            raise FileNotFoundError(f"No cube at {self.path}; run the pipeline first")
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def meta(self) -> Dict[str, str]:
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+    def query(
+        self,
+        categories: Optional[Sequence[str]] = None,
+        keywords: Optional[Sequence[str]] = None,
+        by: Sequence[str] = ("category", "keyword"),
+        order: str = "count",
+        limit: Optional[int] = None,
+        min_count: int = 0,
+    ) -> pd.DataFrame:
+        # Totals over the selected cells, grouped by the `by` dimensions (none
+        # gives one grand-total row). rate is the mean activity per row.
+        unknown = [name for name in by if name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(
+                f"Unknown dimension {unknown[0]!r}; expected any of {list(DIMENSIONS)}"
+            )
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order {order!r}; expected one of {list(ORDERS)}")
+        params: List[object] = []
+        where = [
+            _in_clause(column, values, params)
+            for column, values in (("category", categories), ("keyword", keywords))
+            if values is not None
+        ]
+        keys = ", ".join(by)
+        totals = "SUM(count) AS count, SUM(sum) AS sum, SUM(sum) / SUM(count) AS rate"
+        sql = f"SELECT {keys + ', ' if by else ''}{totals} FROM cube"
+        if where:
+            sql += f" WHERE {' AND '.join(where)}"
+        if by:
+            sql += f" GROUP BY {keys} HAVING SUM(count) >= ? ORDER BY {order} DESC, {keys}"
+            params.append(min_count)
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(limit)
+        with closing(self._connect()) as conn:
+            result = pd.read_sql_query(sql, conn, params=params)
+        return result.set_index(list(by)) if by else result
+
+    def cell(self, category: str, keyword: str) -> Optional[Dict[str, float]]:
+        result = self.query([category], [keyword], by=())
+        if pd.isna(result["count"].iloc[0]):
+            return None
+        return result.iloc[0].to_dict()
+
+    def slice(self, category: Optional[str] = None, keyword: Optional[str] = None) -> pd.DataFrame:
+        # Fixing one dimension breaks the other down; fixing both gives the cell.
+        if category is not None and keyword is not None:
+            return self.query([category], [keyword])
+        if category is not None:
+            return self.query(categories=[category], by=("keyword",))
+        if keyword is not None:
+            return self.query(keywords=[keyword], by=("category",))
+        return self.query(by=("category",))
+
+    def dice(
+        self, categories: Optional[Sequence[str]] = None, keywords: Optional[Sequence[str]] = None
+    ) -> pd.DataFrame:
+        return self.query(categories, keywords)
+
+    def top(
+        self,
+        k: int,
+        dimension: str = "keyword",
+        order: str = "count",
+        categories: Optional[Sequence[str]] = None,
+        keywords: Optional[Sequence[str]] = None,
+        min_count: int = 0,
+    ) -> pd.DataFrame:
+        by = tuple(DIMENSIONS) if dimension == "cell" else (dimension,)
+        return self.query(categories, keywords, by, order, k, min_count)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query the category x keyword cube")
+    parser.add_argument("--db", type=Path, default=CUBE_PATH)
+    parser.add_argument("--category", action="append", help="repeat to select several")
+    parser.add_argument("--keyword", action="append", help="repeat to select several")
+    parser.add_argument(
+        "--by",
+        choices=("category", "keyword", "cell", "total"),
+        default="cell",
+        help="break the selection down by this dimension",
+    )
+    parser.add_argument("--order", choices=ORDERS, default="count")
+    parser.add_argument("--top", type=int, help="keep only the first N rows")
+    parser.add_argument("--min-count", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    by = {"cell": tuple(DIMENSIONS), "total": ()}.get(args.by, (args.by,))
+    started = time.perf_counter()
+    result = CubeStore(args.db).query(
+        args.category, args.keyword, by, args.order, args.top, args.min_count
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(result.to_string() if not result.empty else "No matching cells.")
+    print(f"[CUBE] {len(result):,} row(s) in {elapsed_ms:.1f} ms")
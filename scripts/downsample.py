@@ -0,0 +1,73 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Points kept per pixel column: its lowest and its highest value.
+POINTS_PER_PIXEL = 2
+
+
+def _positions(x: Optional[np.ndarray], n: int) -> np.ndarray:
+    if x is not None and np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").view(np.int64).astype(np.float64)
+    if x is not None and np.issubdtype(x.dtype, np.number):
+        return x.astype(np.float64)
+    return np.arange(n, dtype=np.float64)
+
+
+def _first_per_segment(mask: np.ndarray, segment: np.ndarray) -> np.ndarray:
+    hits = np.flatnonzero(mask)
+    first = np.ones(len(hits), dtype=bool)
+    first[1:] = segment[hits[1:]] != segment[hits[:-1]]
+    return hits[first]
+
+
+def minmax_indices(y: np.ndarray, buckets: int, x: Optional[np.ndarray] = None) -> np.ndarray:
+    # Min/max per pixel bucket: a line through the kept points spans the same
+    # range in every pixel column as the full series, so every spike survives. x must be ascending;
+    # buckets split its range evenly (the row positions when x is None or is
+    # neither numeric nor datetime).
+    n = len(y)
+    if n <= POINTS_PER_PIXEL * buckets:
+        return np.arange(n)
+    pos = _positions(x, n)
+    span = pos[-1] - pos[0]
+    if not np.isfinite(span) or span <= 0:
+        pos, span = np.arange(n, dtype=np.float64), float(n - 1)
+    bucket = np.minimum(((pos - pos[0]) * (buckets / span)).astype(np.int64), buckets - 1)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    segment = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+
+    values = y.astype(np.float64)
+    missing = np.isnan(values)
+    low = np.where(missing, np.inf, values)
+    high = np.where(missing, -np.inf, values)
+    lows = np.minimum.reduceat(low, starts)
+    highs = np.maximum.reduceat(high, starts)
+    keep = np.r_[
+        0,
+        n - 1,
+        _first_per_segment(low == lows[segment], segment),
+        _first_per_segment(high == highs[segment], segment),
+    ]
+    return np.unique(keep)
+
+
+def _index_positions(index: pd.Index) -> Optional[np.ndarray]:
+    # The index is the x axis; one that is not ascending is bucketed by position.
+    return index.to_numpy() if index.is_monotonic_increasing else None
+
+
+def downsample_series(series: pd.Series, width_px: int) -> pd.Series:
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return series.iloc[minmax_indices(values, width_px, _index_positions(series.index))]
+
+
+def downsample_frame(frame: pd.DataFrame, width_px: int) -> pd.DataFrame:
+    # Rows kept for any column are kept for all, so the lines share one x axis.
+    x = _index_positions(frame.index)
+    keep = [
+        minmax_indices(frame[column].to_numpy(dtype=np.float64, na_value=np.nan), width_px, x)
+        for column in frame.columns
+    ]
+    return frame.iloc[np.unique(np.concatenate(keep))] if keep else frame
@@ -0,0 +1,147 @@
+import importlib.util
+import io
+import json
+from itertools import islice
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+
+JSON_LINES_SUFFIXES = (".jsonl", ".ndjson")
+JSON_SUFFIXES = (".json",) + JSON_LINES_SUFFIXES
+# calamine (Rust) parses workbooks many times faster than openpyxl
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else None
+# pyarrow parses JSON lines in C++; without it pandas' own parser is used
+HAS_ARROW_JSON = importlib.util.find_spec("pyarrow") is not None
+
+Source = Union[str, Path, IO[bytes]]
+
+
+# Longest first line looked at when telling JSON lines from a single document.
+PEEK_BYTES = 1 << 20
+
+
+def _peek_lines(source: Source, count: int = 2, size: int = PEEK_BYTES) -> List[bytes]:
+    # The first `count` non-blank lines, each cut at `size` bytes.
+    def read(handle: IO[bytes]) -> List[bytes]:
+        lines: List[bytes] = []
+        while len(lines) < count:
+            line = handle.readline(size)
+            if not line:
+                break
+            if line.strip():
+                lines.append(line.strip())
+        return lines
+
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as handle:
+            return read(handle)
+    position = source.tell()
+    try:
+        return read(source)
+    finally:
+        source.seek(position)
+
+
+def _record(line: bytes) -> Optional[dict]:
+    try:
+        value = json.loads(line)
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def is_json_lines(source: Source) -> bool:
+    # Ad-server exports are often newline-delimited despite a plain .json name.
+    # A .json file counts as JSON lines only when its first line is a whole
+    # object and another object follows; a single document that starts with
+    # '{', such as pandas' column-oriented to_json(), does not.
+    if isinstance(source, (str, Path)) and Path(source).suffix.lower() in JSON_LINES_SUFFIXES:
+        return True
+    lines = _peek_lines(source)
+    if not lines or _record(lines[0]) is None:
+        return False
+    if len(lines) > 1:
+        return lines[1].startswith(b"{")
+    # a lone record of plain values; a one-line document nests its columns
+    return not any(isinstance(value, (dict, list)) for value in _record(lines[0]).values())
+
+
+def conform(
+    frame: pd.DataFrame,
+    dtype: Optional[Dict[str, str]] = None,
+    dates: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    # Applies the read options pandas would have applied while parsing.
+    present = {name: kind for name, kind in (dtype or {}).items() if name in frame.columns}
+    if present:
+        frame = frame.astype(present)
+    for name in dates or ():
+        if name in frame.columns and not pd.api.types.is_datetime64_any_dtype(frame[name]):
+            frame[name] = pd.to_datetime(frame[name], errors="coerce", format="mixed")
+    return frame
+
+
+def _arrow_frame(data: Source, options: Dict[str, object]) -> pd.DataFrame:
+    # imported on first use: it is only needed when JSON lines are read
+    import pyarrow.json as pa_json
+
+    table = pa_json.read_json(data)
+    return conform(table.to_pandas(), options.get("dtype"), options.get("convert_dates"))
+
+
+def read_ndjson(source: Source, **options) -> pd.DataFrame:
+    # Takes pd.read_json's options (dtype, convert_dates) so it can sit in
+    # utils.READERS; pyarrow parses the lines in C++ across its threads.
+    if not HAS_ARROW_JSON:
+        return pd.read_json(source, lines=True, **options)
+    if not isinstance(source, (str, Path)):
+        source = io.BytesIO(source.read())
+    return _arrow_frame(source, options)
+
+
+def iter_ndjson(path: Path, chunksize: int, **options) -> Iterator[pd.DataFrame]:
+    if not HAS_ARROW_JSON:
+        with pd.read_json(path, lines=True, chunksize=chunksize, **options) as reader:
+            yield from reader
+        return
+    # Each block of lines is parsed on its own, so a column may change type
+    # between blocks; conform() settles the ones the schema declares.
+    with open(path, "rb") as handle:
+        while True:
+            lines = list(islice(handle, chunksize))
+            if not lines:
+                break
+            yield _arrow_frame(io.BytesIO(b"".join(lines)), options)
+
+
+def read_json(source: Source, **options) -> pd.DataFrame:
+    if is_json_lines(source):
+        return read_ndjson(source, **options)
+    return pd.read_json(source, **options)
+
+
+def read_excel(source: Source, **options) -> pd.DataFrame:
+    return pd.read_excel(source, engine=EXCEL_ENGINE, **options)
+
+
+def iter_excel(path: Path, chunksize: int, **options) -> Iterator[pd.DataFrame]:
+    # Row-streaming read of the first sheet: memory is bounded by chunksize
+    # rather than by the workbook.
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) for name in header]
+        while True:
+            block = list(islice(rows, chunksize))
+            if not block:
+                break
+            frame = pd.DataFrame.from_records(block, columns=columns)
+            yield conform(frame, options.get("dtype"), options.get("parse_dates"))
+    finally:
+        workbook.close()
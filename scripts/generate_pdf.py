@@ -1,15 +1,29 @@
-from datetime import datetime
+from __future__ import annotations
+
+import io
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Union
 
-from fpdf import FPDF
+from fpdf import FPDF, FPDF_VERSION
 
-from charts import ChartArtifact
 from insights import InsightSections
+from report import ReportModel, build_report_model
+
+if TYPE_CHECKING:
+    from charts import ChartArtifact
 
 OUTPUT_PATH = Path("data") / "output" / "InsightForge_Report.pdf"
 
 ACCENT_RGB = (31, 78, 121)
+# fpdf2 embeds images from memory and returns bytes; the classic 1.7 release
+# only reads image files and returns a latin-1 string.
+FPDF2 = int(FPDF_VERSION.split(".")[0]) >= 2
+
+# (page title, sections) for the summary pages that precede the charts
+SUMMARY_PAGES = [
+    ("Executive Snapshot", ("overview", "key_metrics", "trends")),
+    ("Risks & Recommended Plays", ("anomalies", "recommendations", "summary")),
+]
 
 
 def _safe(text: str) -> str:
@@ -32,14 +46,14 @@ class InsightPDF(FPDF):
         self.cell(0, 10, _safe(f"InsightForge - Page {self.page_no()}"), align="C")
 
 
-def _add_cover(pdf: InsightPDF, timestamp: str) -> None:
+def _add_cover(pdf: InsightPDF, title: str, timestamp: str) -> None:
     pdf.add_page()
     pdf.set_fill_color(*ACCENT_RGB)
     pdf.rect(0, 0, pdf.w, 40, "F")
     pdf.set_text_color(255, 255, 255)
     pdf.set_font("Helvetica", "B", 24)
     pdf.ln(12)
-    pdf.cell(0, 10, _safe("InsightForge Executive Brief"), ln=True, align="C")
+    pdf.cell(0, 10, _safe(title), ln=True, align="C")
     pdf.set_font("Helvetica", "", 14)
     pdf.cell(0, 10, _safe(f"Generated {timestamp}"), ln=True, align="C")
     pdf.ln(40)
@@ -80,47 +94,47 @@ def _add_summary_page(pdf: InsightPDF, title: str, blocks: Iterable[tuple[str, I
         pdf.ln(2)
 
 
+def _image_source(chart: ChartArtifact) -> Union[str, io.BytesIO]:
+    if FPDF2 and chart.image is not None:
+        return io.BytesIO(chart.image)
+    return str(chart.path)
+
+
 def _add_chart_page(pdf: InsightPDF, chart: ChartArtifact) -> None:
     pdf.add_page()
     pdf.set_text_color(*ACCENT_RGB)
     pdf.set_font("Helvetica", "B", 16)
     pdf.cell(0, 10, _safe(chart.title), ln=True)
     pdf.ln(2)
-    pdf.image(str(chart.path), x=15, y=30, w=180)
+    pdf.image(_image_source(chart), x=15, y=30, w=180)
     pdf.set_y(150)
     pdf.set_text_color(80, 80, 80)
     pdf.set_font("Helvetica", "I", 12)
     pdf.multi_cell(0, 8, _safe(chart.description))
 
 
-def build_pdf(insights: InsightSections, charts: Iterable[ChartArtifact]) -> Path:
+def render_pdf(model: ReportModel, stream: BinaryIO) -> None:
     pdf = InsightPDF()
     pdf.set_auto_page_break(auto=True, margin=20)
-    timestamp = datetime.now().strftime("%d %b %Y %H:%M")
-
-    _add_cover(pdf, timestamp)
-    _add_summary_page(
-        pdf,
-        "Executive Snapshot",
-        [
-            ("Overview", insights.overview),
-            ("Key Metrics", insights.key_metrics),
-            ("Trend Diagnostics", insights.trends),
-        ],
-    )
-    _add_summary_page(
-        pdf,
-        "Risks & Recommended Plays",
-        [
-            ("Anomalies & Watchouts", insights.anomalies),
-            ("Strategic Recommendations", insights.recommendations),
-            ("Closing Summary", insights.summary),
-        ],
-    )
 
-    for chart in charts:
+    _add_cover(pdf, model.title, model.timestamp)
+    for title, keys in SUMMARY_PAGES:
+        blocks = [(model.sections[key].title, model.bullets(key)) for key in keys]
+        _add_summary_page(pdf, title, blocks)
+
+    for chart in model.charts:
         _add_chart_page(pdf, chart)
 
-    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    pdf.output(str(OUTPUT_PATH))
-    return OUTPUT_PATH
\ No newline at end of file
+    document = pdf.output() if FPDF2 else pdf.output(dest="S").encode("latin-1")
+    stream.write(bytes(document))
+
+
+def build_pdf(
+    insights: InsightSections,
+    charts: Iterable[ChartArtifact],
+    output_path: Path = OUTPUT_PATH,
+) -> Path:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "wb") as stream:
+        render_pdf(build_report_model(insights, list(charts)), stream)
+    return output_path
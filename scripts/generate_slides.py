@@ -1,19 +1,33 @@
-from datetime import datetime
+from __future__ import annotations
+
+import io
 from pathlib import Path
-from typing import Iterable, List
+from typing import TYPE_CHECKING, BinaryIO, Iterable, List
 
 from pptx import Presentation
 from pptx.dml.color import RGBColor
 from pptx.util import Inches, Pt
 
-from charts import ChartArtifact
 from insights import InsightSections
+from report import ReportModel, build_report_model
+
+if TYPE_CHECKING:
+    from charts import ChartArtifact
 
 OUTPUT_PATH = Path("data") / "output" / "InsightForge_Report.pptx"
 
 BODY_FONT = "Calibri"
 ACCENT_RGB = RGBColor(31, 78, 121)
 
+# (section, slide title, bullet limit) in deck order, before the chart slides
+SECTION_SLIDES = [
+    ("overview", "Executive Overview", 6),
+    ("key_metrics", "Key Metrics", 6),
+    ("trends", "Trend Signals", 6),
+    ("anomalies", "Anomalies & Watchouts", 4),
+    ("recommendations", "Strategic Recommendations", 4),
+]
+
 
 def _add_bullets(placeholder, lines: List[str]) -> None:
     placeholder.text = ""
@@ -32,9 +46,9 @@ def _add_bullets(placeholder, lines: List[str]) -> None:
             p.font.color.rgb = ACCENT_RGB
 
 
-def _add_cover_slide(prs: Presentation, timestamp: str) -> None:
+def _add_cover_slide(prs: Presentation, title: str, timestamp: str) -> None:
     slide = prs.slides.add_slide(prs.slide_layouts[0])
-    slide.shapes.title.text = "InsightForge Executive Brief"
+    slide.shapes.title.text = title
     slide.shapes.title.text_frame.paragraphs[0].font.color.rgb = ACCENT_RGB
     subtitle = slide.placeholders[1]
     subtitle.text = f"Automated insight pack • {timestamp}"
@@ -57,7 +71,8 @@ def _add_chart_slide(prs: Presentation, chart: ChartArtifact) -> None:
     slide.shapes.title.text_frame.paragraphs[0].font.color.rgb = ACCENT_RGB
     left = Inches(0.9)
     top = Inches(1.2)
-    slide.shapes.add_picture(str(chart.path), left, top, width=Inches(8))
+    image = io.BytesIO(chart.image) if chart.image is not None else str(chart.path)
+    slide.shapes.add_picture(image, left, top, width=Inches(8))
 
     tx_box = slide.shapes.add_textbox(Inches(0.9), Inches(6.2), Inches(8), Inches(1))
     tf = tx_box.text_frame
@@ -67,22 +82,26 @@ def _add_chart_slide(prs: Presentation, chart: ChartArtifact) -> None:
     tf.paragraphs[0].font.color.rgb = ACCENT_RGB
 
 
-def build_presentation(insights: InsightSections, charts: Iterable[ChartArtifact]) -> Path:
+def render_presentation(model: ReportModel, stream: BinaryIO) -> None:
     prs = Presentation()
-    timestamp = datetime.now().strftime("%d %b %Y %H:%M")
 
-    _add_cover_slide(prs, timestamp)
-    _add_section_slide(prs, "Executive Overview", insights.overview)
-    _add_section_slide(prs, "Key Metrics", insights.key_metrics)
-    _add_section_slide(prs, "Trend Signals", insights.trends)
-    _add_section_slide(prs, "Anomalies & Watchouts", insights.anomalies, limit=4)
-    _add_section_slide(prs, "Strategic Recommendations", insights.recommendations, limit=4)
+    _add_cover_slide(prs, model.title, model.timestamp)
+    for key, title, limit in SECTION_SLIDES:
+        _add_section_slide(prs, title, model.bullets(key), limit=limit)
 
-    for chart in charts:
+    for chart in model.charts:
         _add_chart_slide(prs, chart)
 
-    _add_section_slide(prs, "Closing Summary", insights.summary)
+    _add_section_slide(prs, "Closing Summary", model.bullets("summary"))
+    prs.save(stream)
+
 
-    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    prs.save(OUTPUT_PATH)
-    return OUTPUT_PATH
\ No newline at end of file
+def build_presentation(
+    insights: InsightSections,
+    charts: Iterable[ChartArtifact],
+    output_path: Path = OUTPUT_PATH,
+) -> Path:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "wb") as stream:
+        render_presentation(build_report_model(insights, list(charts)), stream)
+    return output_path
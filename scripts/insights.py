@@ -1,16 +1,32 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import asyncio
 import json
+import time
 
-import pandas as pd
+import numpy as np
 
-try:
-    import openai  # type: ignore
-except ImportError:  # pragma: no cover
-    openai = None
+from aggregates import DatasetAggregates
+from anomalies import describe_anomalies, find_anomalies
+from prompts import (
+    DEFAULT_PROMPT_TOKENS,
+    ESSENTIAL,
+    PromptItem,
+    PromptUsage,
+    compact_metrics,
+    estimate_tokens,
+    to_json,
+)
+from providers import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RETRIES,
+    DEFAULT_TIMEOUT,
+    InsightProvider,
+    ResponseCache,
+)
 
 
 @dataclass
@@ -36,7 +52,9 @@ class InsightSections:
         return bullets
 
 
-def _fallback_insights(df: pd.DataFrame) -> InsightSections:
+def _fallback_insights(
+    aggregates: DatasetAggregates, history: Optional[List[str]] = None
+) -> InsightSections:
     overview: List[str] = []
     key_metrics: List[str] = []
     trends: List[str] = []
@@ -44,20 +62,30 @@ def _fallback_insights(df: pd.DataFrame) -> InsightSections:
     recommendations: List[str] = []
     summary: List[str] = []
 
-    total_rows = len(df)
-    if "category" in df.columns:
-        category_note = f"{df['category'].nunique()} categories"
+    category_stats = aggregates.group("category")
+    keyword_stats = aggregates.group("ad_keywords")
+
+    total_rows = aggregates.row_count
+    if category_stats is not None:
+        category_note = f"{category_stats.unique} categories"
     else:
         category_note = "mixed feature set"
     overview.append(f"Ingested {total_rows:,} rows covering {category_note}.")
+    users = aggregates.distinct.get("user_id")
+    if users is not None:
+        overview.append(
+            f"Reached roughly {users.estimate():,.0f} distinct users "
+            f"(±{users.relative_error * 100:.1f}%)."
+        )
 
-    if "activity" in df.columns:
-        activity_rate = df["activity"].mean() * 100
+    if aggregates.has_activity:
+        anomalies.extend(
+            describe_anomalies(find_anomalies(aggregates), aggregates.timeline_kind)
+        )
+        activity_rate = aggregates.activity_mean * 100
         key_metrics.append(f"Portfolio-wide activity rate sits at {activity_rate:.1f}%.")
-        if "category" in df.columns:
-            cat_perf = (
-                df.groupby("category")["activity"].mean().sort_values(ascending=False) * 100
-            )
+        if category_stats is not None:
+            cat_perf = category_stats.rates() * 100
             best_cat = cat_perf.index[0]
             worst_cat = cat_perf.index[-1]
             trends.append(
@@ -73,19 +101,16 @@ def _fallback_insights(df: pd.DataFrame) -> InsightSections:
                 anomalies.append(f"{cat} outperforms materially at {rate:.1f}% activation.")
             for cat, rate in low_outliers.items():
                 anomalies.append(f"{cat} under-indexes at {rate:.1f}% activation.")
-        if "ad_keywords" in df.columns:
-            kw_perf = (
-                df.groupby("ad_keywords")["activity"]
-                .agg(["mean", "count"])
-                .query("count >= 5")
-                .sort_values("mean", ascending=False)
-            )
+        # week-over-week lines from the rollup store
+        trends.extend(history or [])
+        if keyword_stats is not None:
+            kw_perf = keyword_stats.rates(min_count=5)
             if not kw_perf.empty:
                 top_kw = kw_perf.index[0]
                 key_metrics.append(
-                    f"Keyword '{top_kw}' tops conversion at {kw_perf.iloc[0]['mean']*100:.1f}%."
+                    f"Keyword '{top_kw}' tops conversion at {kw_perf.iloc[0]*100:.1f}%."
                 )
-                rec_low = kw_perf.tail(1).index[0]
+                rec_low = kw_perf.index[-1]
                 recommendations.append(
                     f"Reallocate spend from '{rec_low}' into '{top_kw}' to lift ROI."
                 )
@@ -106,7 +131,13 @@ def _fallback_insights(df: pd.DataFrame) -> InsightSections:
     )
 
 
-def _build_prompt(metrics: Dict[str, str]) -> str:
+# Candidates offered to the prompt; the token budget decides how many are sent.
+PROMPT_ANOMALIES = 10
+PROMPT_CATEGORIES = 10
+PROMPT_KEYWORDS = 25
+
+
+def _build_prompt(summary: str) -> str:
     return f"""
 You are an executive insights partner at a top-tier consulting firm.
 Craft concise narrative bullets for a C-level weekly business review.
@@ -116,72 +147,215 @@ Each key should contain an array of 2-4 punchy bullet strings (max 160 chars eac
 Prioritise comparisons, cause/effect, and actionable recommendations.
 Avoid generic statements. Sound confident and data-backed.
 
-DATA SUMMARY:
-{metrics}
+DATA SUMMARY (JSON, most important first):
+{summary}
 """
 
 
-def _collect_metrics(df: pd.DataFrame) -> Dict[str, str]:
-    metrics: Dict[str, str] = {}
-    metrics["row_count"] = str(len(df))
+def _standouts(aggregates: DatasetAggregates, column: str, limit: int) -> Dict[str, str]:
+    # Groups whose activity rate sits furthest from the overall rate, weighted by
+    # volume, so a single-row keyword at 100% does not outrank a real shift.
+    stats = aggregates.group(column)
+    if stats is None or "mean" not in stats.table.columns:
+        return {}
+    table = stats.table
+    salience = (table["mean"] - aggregates.activity_mean).abs() * np.sqrt(table["count"])
+    ranked = table.loc[salience.sort_values(ascending=False, kind="stable").index[:limit]]
+    return {
+        str(name): f"{rate * 100:.1f}% of {int(count):,}"
+        for name, rate, count in zip(ranked.index, ranked["mean"], ranked["count"])
+    }
+
+
+def _collect_metrics(
+    aggregates: DatasetAggregates, history: Optional[List[str]] = None
+) -> List[PromptItem]:
+    items = [PromptItem("row_count", aggregates.row_count, ESSENTIAL)]
     for col in ("category", "ad_keywords"):
-        if col in df.columns:
-            metrics[f"{col}_unique"] = str(df[col].nunique())
-    if "activity" in df.columns:
-        metrics["activity_rate"] = f"{df['activity'].mean() * 100:.2f}"
-        metrics["active_volume"] = str(int(df["activity"].sum()))
-        metrics["inactive_volume"] = str(int((1 - df["activity"]) .sum()))
-    if {"activity", "category"}.issubset(df.columns):
-        top_cat = (
-            df.groupby("category")["activity"].mean().sort_values(ascending=False).head(3)
-        )
-        metrics["top_categories"] = ", ".join(
-            f"{idx}:{val*100:.1f}%" for idx, val in top_cat.items()
-        )
-    if {"activity", "ad_keywords"}.issubset(df.columns):
-        top_kw = (
-            df.groupby("ad_keywords")["activity"]
-            .mean()
-            .sort_values(ascending=False)
-            .head(5)
-        )
-        metrics["top_keywords"] = ", ".join(
-            f"{idx}:{val*100:.1f}%" for idx, val in top_kw.items()
+        unique = aggregates.unique(col)
+        if unique is not None:
+            items.append(PromptItem(f"{col}_unique", unique, 50))
+    # sketch mode: distinct counts and keyword volumes are estimates, and the
+    # estimates are never sent without their error bounds
+    for col, sketch in aggregates.distinct.items():
+        error = f"±{sketch.relative_error * 100:.1f}%"
+        items.append(PromptItem(f"{col}_unique_error", error, ESSENTIAL))
+    if aggregates.keyword_sketch is not None:
+        error = f"±{aggregates.keyword_sketch.max_error:,.0f} rows"
+        items.append(PromptItem("ad_keywords_count_error", error, ESSENTIAL))
+    if aggregates.has_activity:
+        active = int(aggregates.activity_sum)
+        items += [
+            PromptItem("activity_rate_pct", round(aggregates.activity_mean * 100, 2), ESSENTIAL),
+            PromptItem("active_rows", active, ESSENTIAL),
+            PromptItem("inactive_rows", aggregates.row_count - active, 10),
+        ]
+        flagged = describe_anomalies(
+            find_anomalies(aggregates), aggregates.timeline_kind, limit=PROMPT_ANOMALIES
         )
-    return metrics
-
-
-def _invoke_llm(prompt: str) -> Optional[InsightSections]:
-    if openai is None:
-        return None
-    try:
-        completion = openai.ChatCompletion.create(  # type: ignore[attr-defined]
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an executive insights generator."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.4,
-            max_tokens=600,
-        )
-        content = completion.choices[0].message["content"]  # type: ignore[index]
-        data = json.loads(content)
-        return InsightSections(
-            overview=list(data.get("overview", [])),
-            key_metrics=list(data.get("key_metrics", [])),
-            trends=list(data.get("trends", [])),
-            anomalies=list(data.get("anomalies", [])),
-            recommendations=list(data.get("recommendations", [])),
-            summary=list(data.get("summary", [])),
-        )
-    except Exception:
-        return None
+        if flagged:
+            items.append(PromptItem("anomalies", flagged, 90))
+        if history:
+            items.append(PromptItem("week_over_week", list(history), 80))
+        categories = _standouts(aggregates, "category", PROMPT_CATEGORIES)
+        if categories:
+            items.append(PromptItem("standout_categories", categories, 70))
+        keywords = _standouts(aggregates, "ad_keywords", PROMPT_KEYWORDS)
+        if keywords:
+            items.append(PromptItem("standout_keywords", keywords, 60))
+    return items
+
+
+def build_prompt(
+    aggregates: DatasetAggregates,
+    history: Optional[List[str]] = None,
+    token_budget: int = DEFAULT_PROMPT_TOKENS,
+) -> Tuple[str, PromptUsage]:
+    items = _collect_metrics(aggregates, history)
+    summary, dropped = compact_metrics(items, token_budget)
+    prompt = _build_prompt(to_json(summary))
+    usage = PromptUsage(
+        token_budget,
+        prompt_tokens=estimate_tokens(prompt),
+        prompt_chars=len(prompt),
+        kept=list(summary),
+        dropped=dropped,
+    )
+    return prompt, usage
+
+
+def _parse_sections(content: str) -> InsightSections:
+    data = json.loads(content)
+    return InsightSections(
+        overview=list(data.get("overview", [])),
+        key_metrics=list(data.get("key_metrics", [])),
+        trends=list(data.get("trends", [])),
+        anomalies=list(data.get("anomalies", [])),
+        recommendations=list(data.get("recommendations", [])),
+        summary=list(data.get("summary", [])),
+    )
+
+
+async def _invoke_llm(
+    prompt: str,
+    provider: InsightProvider,
+    cache: Optional[ResponseCache],
+    semaphore: asyncio.Semaphore,
+    timeout: float,
+    retries: int,
+    usage: Optional[PromptUsage] = None,
+) -> Optional[InsightSections]:
+    usage = usage or PromptUsage(0)
+    key = cache.key(provider, prompt) if cache is not None else None
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            try:
+                sections = _parse_sections(cached)
+            except ValueError:
+                pass
+            else:
+                usage.cached = usage.succeeded = True
+                return sections
+
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    content = await asyncio.wait_for(provider.complete(prompt), timeout)
+                    sections = _parse_sections(content)
+                except asyncio.TimeoutError:
+                    print(
+                        f"[WARN] {provider.name} timed out after {timeout:g}s "
+                        f"(attempt {attempt + 1})"
+                    )
+                except Exception as e:
+                    print(f"[WARN] {provider.name} call failed (attempt {attempt + 1}): {e}")
+                else:
+                    if key is not None:
+                        cache.put(key, content)
+                    usage.succeeded = True
+                    return sections
+                if attempt < retries:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+        finally:
+            # wall time across attempts, as the run experienced it
+            usage.latency_s = time.perf_counter() - started
+    return None
+
+
+async def _gather_insights(
+    prompts: Sequence[str],
+    provider: InsightProvider,
+    cache: Optional[ResponseCache],
+    concurrency: int,
+    timeout: float,
+    retries: int,
+    usages: Sequence[PromptUsage],
+) -> List[Optional[InsightSections]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    calls = [
+        _invoke_llm(prompt, provider, cache, semaphore, timeout, retries, usage)
+        for prompt, usage in zip(prompts, usages)
+    ]
+    return await asyncio.gather(*calls)
+
+
+def generate_llm_insights_batch(
+    batch: Sequence[DatasetAggregates],
+    provider: Optional[InsightProvider] = None,
+    cache: Optional[ResponseCache] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    histories: Optional[Sequence[Optional[List[str]]]] = None,
+    token_budget: int = DEFAULT_PROMPT_TOKENS,
+    usages: Optional[List[PromptUsage]] = None,
+) -> List[InsightSections]:
+    # usages, when given, receives one PromptUsage per dataset sent to the provider
+    histories = histories or [None] * len(batch)
+    if provider is None:
+        return [
+            _fallback_insights(aggregates, history)
+            for aggregates, history in zip(batch, histories)
+        ]
+
+    built = [
+        build_prompt(aggregates, history, token_budget)
+        for aggregates, history in zip(batch, histories)
+    ]
+    prompts = [prompt for prompt, _ in built]
+    batch_usages = [usage for _, usage in built]
+    results = asyncio.run(
+        _gather_insights(prompts, provider, cache, concurrency, timeout, retries, batch_usages)
+    )
+    if usages is not None:
+        usages.extend(batch_usages)
+    return [
+        result if result is not None else _fallback_insights(aggregates, history)
+        for aggregates, history, result in zip(batch, histories, results)
+    ]
 
 
-def generate_llm_insights(df: pd.DataFrame) -> InsightSections:
-    metrics = _collect_metrics(df)
-    prompt = _build_prompt(metrics)
-    llm_result = _invoke_llm(prompt)
-    if llm_result:
-        return llm_result
-    return _fallback_insights(df)
\ No newline at end of file
+def generate_llm_insights(
+    aggregates: DatasetAggregates,
+    provider: Optional[InsightProvider] = None,
+    cache: Optional[ResponseCache] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    history: Optional[List[str]] = None,
+    token_budget: int = DEFAULT_PROMPT_TOKENS,
+    usages: Optional[List[PromptUsage]] = None,
+) -> InsightSections:
+    return generate_llm_insights_batch(
+        [aggregates],
+        provider,
+        cache,
+        concurrency=1,
+        timeout=timeout,
+        retries=retries,
+        histories=[history],
+        token_budget=token_budget,
+        usages=usages,
+    )[0]
@@ -1,62 +1,720 @@
+import time
 
+# Taken before the heavier imports below so the manifest can report start-up.
+STARTED = time.perf_counter()
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
 from datetime import datetime
 from pathlib import Path
-from typing import Union
+from typing import Iterable, List, Optional, Sequence, Union
 
 import pandas as pd
 
-from charts import ChartArtifact, generate_charts
-from generate_pdf import build_pdf
-from generate_slides import build_presentation
+from aggregates import (
+    DatasetAggregates,
+    accumulate_aggregates,
+    build_aggregates,
+    merge_aggregates,
+)
+from anomalies import find_anomalies
+from cache import CHART_CACHE_DIR, MAX_CACHE_BYTES, IngestCache
+from cube import CUBE_PATH, write_cube
 from insights import InsightSections, generate_llm_insights
-from utils import clean_data, load_csv, load_excel, load_json
+from profiling import MANIFEST_PATH, RunProfiler
+from prompts import DEFAULT_PROMPT_TOKENS, PromptUsage
+from providers import DEFAULT_TIMEOUT, InsightProvider, ResponseCache, get_provider
+from report import SECTION_TITLES, build_report_model
+from rollups import ROLLUP_PATH, RollupStore, describe_trends
+from schema import REGISTRY
+from service import (
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_WORKERS,
+    ServiceConfig,
+    serve,
+)
+from sketches import DEFAULT_CAPACITY
+from sql_source import aggregate_table, iter_sql_chunks, load_sql_table
+from utils import (
+    DEFAULT_CHUNKSIZE,
+    IngestReport,
+    clean_data,
+    list_input_files,
+    read_file,
+    read_files,
+)
+from watcher import POLL_INTERVAL, aggregate_file, watch
 
 INPUT_DIR = Path("data") / "input"
 OUTPUT_DIR = Path("data") / "output"
 
+# Stages a run can be limited to. matplotlib, python-pptx and fpdf are only
+# imported by the stage that needs them.
+STAGES = ("ingest", "insights", "charts", "pdf", "pptx")
+STAGE_REQUIRES = {
+    "insights": ("ingest",),
+    "charts": ("ingest",),
+    "pdf": ("insights", "charts"),
+    "pptx": ("insights", "charts"),
+}
+REPORT_FORMATS = ("pptx", "pdf")
 
-def run_pipeline(folder: Union[str, Path] = INPUT_DIR) -> None:
-    folder = Path(folder)
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-    print(f"[INGEST] Scanning {folder} for CSV/Excel/JSON files")
+def resolve_stages(requested: Iterable[str]) -> List[str]:
+    selected = set()
+    pending = list(requested)
+    while pending:
+        stage = pending.pop()
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage '{stage}'; expected any of {', '.join(STAGES)}")
+        if stage not in selected:
+            selected.add(stage)
+            pending.extend(STAGE_REQUIRES.get(stage, ()))
+    return [stage for stage in STAGES if stage in selected]
 
-    df_csv = load_csv(folder)
-    df_xlsx = load_excel(folder)
-    df_json = load_json(folder)
 
-    if any(not df.empty for df in (df_csv, df_xlsx, df_json)):
-        frames = [df for df in (df_csv, df_xlsx, df_json) if not df.empty]
-        raw_df = pd.concat(frames, ignore_index=True)
-    else:
-        raw_df = pd.DataFrame()
+def _record_ingest(profiler: RunProfiler, report: IngestReport) -> None:
+    report.log()
+    profiler.metadata["ingest"] = report.to_dict()
+
+
+def _load_cleaned_batch(folder: Path, profiler: RunProfiler, workers: int = 1) -> pd.DataFrame:
+    with profiler.stage("ingest") as stage:
+        files, schema, rejected = REGISTRY.check(list_input_files(folder))
+        frames, report = read_files(files, schema, workers)
+        report.skip(rejected)
+        raw_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        stage.rows = len(raw_df)
+    _record_ingest(profiler, report)
 
     if raw_df.empty:
-        print("[ERROR] No data files found or loaded.")
-        return
+        return raw_df
 
     print("[CLEAN] Cleaning dataset")
-    cleaned_df = clean_data(raw_df)
+    with profiler.stage("clean", rows=len(raw_df)):
+        return clean_data(raw_df, report_memory=True)
+
+
+def _load_cleaned_cached(
+    folder: Path, cache: IngestCache, profiler: RunProfiler, workers: int = 1
+) -> pd.DataFrame:
+    print("[CLEAN] Loading cleaned files from cache where unchanged")
+    hits = set()
+
+    # Cache misses are read and cleaned together, so both land in one stage.
+    with profiler.stage("ingest") as stage:
+        files, schema, rejected = REGISTRY.check(list_input_files(folder))
+
+        def load(file: Path) -> pd.DataFrame:
+            cleaned = cache.get(file)
+            if cleaned is not None:
+                hits.add(file)
+                return cleaned
+            raw = read_file(file, schema)
+            return raw if raw.empty else clean_data(raw, report_memory=True)
+
+        frames, report = read_files(files, workers=workers, loader=load)
+        report.skip(rejected)
+        # written from this thread once reading is done; eviction is not thread-safe
+        for frame, result in zip(frames, report.with_status("loaded")):
+            if result.path not in hits:
+                cache.put(result.path, frame)
+
+        print(f"[CACHE] {len(hits)}/{len(frames)} files served from {cache.directory}")
+        profiler.metadata["cache_hits"] = len(hits)
+        combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if any(list(frame.columns) != list(combined.columns) for frame in frames):
+            # Columns missing from some files surface as gaps after the concat.
+            combined = clean_data(combined)
+        stage.rows = len(combined)
+    _record_ingest(profiler, report)
+    return combined
+
+
+def load_cleaned(
+    folder: Path,
+    cache: Optional[IngestCache] = None,
+    profiler: Optional[RunProfiler] = None,
+    workers: int = 1,
+) -> pd.DataFrame:
+    # workers: files read concurrently on a thread pool
+    profiler = profiler or RunProfiler()
+    if cache is not None and cache.available:
+        return _load_cleaned_cached(folder, cache, profiler, workers)
+    return _load_cleaned_batch(folder, profiler, workers)
+
+
+def _load_cleaned_sql(
+    db_path: Path, table: str, chunksize: int, profiler: RunProfiler
+) -> pd.DataFrame:
+    with profiler.stage("ingest") as stage:
+        try:
+            raw_df = load_sql_table(db_path, table, chunksize)
+        except Exception as e:
+            print(f"[WARN] Failed to load table {table} from {db_path}: {e}")
+            return pd.DataFrame()
+        stage.rows = len(raw_df)
+    if raw_df.empty:
+        return raw_df
+    print("[CLEAN] Cleaning dataset")
+    with profiler.stage("clean", rows=len(raw_df)):
+        return clean_data(raw_df, report_memory=True)
+
+
+def _aggregate_sql(
+    db_path: Path, table: str, chunksize: int, profiler: RunProfiler
+) -> Optional[DatasetAggregates]:
+    print(f"[AGGREGATE] Pushing aggregation for table {table} down into SQLite")
+    with profiler.stage("aggregate") as stage:
+        try:
+            aggregates = aggregate_table(db_path, table, chunksize)
+        except Exception as e:
+            print(f"[WARN] Failed to aggregate table {table} from {db_path}: {e}")
+            return None
+        stage.rows = aggregates.row_count if aggregates is not None else 0
+    return aggregates
+
+
+def _aggregate_files(
+    folder: Path, chunksize: int, sketch_capacity: Optional[int] = None
+) -> Optional[DatasetAggregates]:
+    # Each file is aggregated on its own, so one that fails part-way is left
+    # out whole instead of contributing its leading chunks.
+    files, schema = REGISTRY.validate(list_input_files(folder))
+    total: Optional[DatasetAggregates] = None
+    for file in files:
+        try:
+            first_row = total.row_count if total is not None else 0
+            partial = aggregate_file(file, chunksize, schema, sketch_capacity, first_row)
+        except Exception as e:
+            print(f"[WARN] Failed to read {file.name}; leaving it out: {e}")
+            continue
+        if partial is not None:
+            total = partial if total is None else merge_aggregates(total, partial)
+    return total
+
+
+def _aggregate_stream(
+    folder: Path,
+    chunksize: int,
+    profiler: RunProfiler,
+    sql_table: Optional[str] = None,
+    sketch_capacity: Optional[int] = None,
+) -> Optional[DatasetAggregates]:
+    print(f"[CLEAN] Cleaning and aggregating in chunks of {chunksize:,} rows")
+    with profiler.stage("stream") as stage:
+        if sql_table is not None:
+            chunks = iter_sql_chunks(folder, sql_table, chunksize)
+            cleaned_chunks = (clean_data(chunk) for chunk in chunks)
+            aggregates = accumulate_aggregates(cleaned_chunks, sketch_capacity)
+        else:
+            aggregates = _aggregate_files(folder, chunksize, sketch_capacity)
+        stage.rows = aggregates.row_count if aggregates is not None else 0
+    return aggregates
+
+
+def _timed_insights(
+    profiler: RunProfiler,
+    aggregates: DatasetAggregates,
+    provider: Optional[InsightProvider],
+    llm_cache: Optional[ResponseCache],
+    llm_timeout: float,
+    history: Optional[List[str]],
+    prompt_budget: int,
+) -> InsightSections:
+    usages: List[PromptUsage] = []
+    with profiler.stage("insight"):
+        insights = generate_llm_insights(
+            aggregates,
+            provider,
+            llm_cache,
+            llm_timeout,
+            history=history,
+            token_budget=prompt_budget,
+            usages=usages,
+        )
+    _record_prompts(profiler, usages)
+    return insights
+
+
+def _record_prompts(profiler: RunProfiler, usages: List[PromptUsage]) -> None:
+    if not usages:
+        return  # no provider; insights were derived locally
+    profiler.metadata["prompts"] = [asdict(usage) for usage in usages]
+    tokens = sum(usage.prompt_tokens for usage in usages)
+    latencies = [usage.latency_s for usage in usages if usage.latency_s is not None]
+    response = f", response in {max(latencies):.2f}s" if latencies else " (cached)"
+    dropped = sorted({key for usage in usages for key in usage.dropped})
+    print(
+        f"[INSIGHT] {len(usages)} prompt(s), ~{tokens:,} tokens"
+        f" (budget {usages[0].token_budget:,} for data){response}"
+        + (f"; left out: {', '.join(dropped)}" if dropped else "")
+    )
+
 
+def _update_rollups(
+    rollups: RollupStore, aggregates: DatasetAggregates, profiler: RunProfiler
+) -> Optional[List[str]]:
+    print("[ROLLUP] Updating daily/weekly rollups")
+    with profiler.stage("rollup"):
+        try:
+            rollups.record(aggregates)
+            return describe_trends(rollups)
+        except Exception as e:
+            print(f"[WARN] Rollup store unavailable: {e}")
+            return None
+
+
+def _update_cube(cube_path: Path, aggregates: DatasetAggregates, profiler: RunProfiler) -> None:
+    with profiler.stage("cube"):
+        try:
+            write_cube(aggregates, cube_path, str(profiler.metadata.get("folder", "")))
+        except Exception as e:
+            print(f"[WARN] Could not write the cube: {e}")
+
+
+def build_reports(
+    aggregates: DatasetAggregates,
+    chart_workers: int = 1,
+    provider: Optional[InsightProvider] = None,
+    llm_cache: Optional[ResponseCache] = None,
+    llm_timeout: float = DEFAULT_TIMEOUT,
+    profiler: Optional[RunProfiler] = None,
+    rollups: Optional[RollupStore] = None,
+    chart_cache_dir: Optional[Path] = CHART_CACHE_DIR,
+    stages: Sequence[str] = STAGES,
+    cube_path: Optional[Path] = CUBE_PATH,
+    prompt_budget: int = DEFAULT_PROMPT_TOKENS,
+) -> None:
+    profiler = profiler or RunProfiler()
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     print(f"[META] Processing timestamp: {timestamp}")
+    history = _update_rollups(rollups, aggregates, profiler) if rollups is not None else None
+    if cube_path is not None:
+        _update_cube(cube_path, aggregates, profiler)
 
-    print("[INSIGHT] Generating insights")
-    insights = generate_llm_insights(cleaned_df)
+    if "insights" in stages or "charts" in stages:
+        # Scanned here, before insights and charts run side by side, so both
+        # (and any chart workers) reuse one result.
+        with profiler.stage("anomalies"):
+            find_anomalies(aggregates)
 
-    print("[VISUALS] Generating charts")
-    chart_paths = generate_charts(cleaned_df)
+    insights: Optional[InsightSections] = None
+    charts = []
+    # The provider call is network-bound, so it overlaps with chart rendering.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending_insights = None
+        if "insights" in stages:
+            print("[INSIGHT] Generating insights")
+            pending_insights = executor.submit(
+                _timed_insights,
+                profiler,
+                aggregates,
+                provider,
+                llm_cache,
+                llm_timeout,
+                history,
+                prompt_budget,
+            )
 
-    print("[REPORT] Building presentation")
-    ppt_path = build_presentation(insights, chart_paths)
+        if "charts" in stages:
+            print("[VISUALS] Generating charts")
+            with profiler.stage("charts"):
+                from charts import generate_charts
 
-    print("[REPORT] Building PDF")
-    pdf_path = build_pdf(insights, chart_paths)
+                charts = generate_charts(
+                    aggregates, workers=chart_workers, profiler=profiler, cache_dir=chart_cache_dir
+                )
+        if pending_insights is not None:
+            insights = pending_insights.result()
+
+    formats = [fmt for fmt in REPORT_FORMATS if fmt in stages]
+    paths = {}
+    if formats:
+        # The selected formats render concurrently from one shared report model.
+        print(f"[REPORT] Building {' and '.join(fmt.upper() for fmt in formats)}")
+        with profiler.stage("reports"):
+            from renderers import write_reports
+
+            paths = write_reports(build_report_model(insights, charts), OUTPUT_DIR, formats)
+    elif insights is not None:
+        for key, title in SECTION_TITLES.items():
+            print(f"[INSIGHT] {title}")
+            for bullet in getattr(insights, key):
+                print(f"  - {bullet}")
 
     print("Pipeline completed successfully.")
-    print(f"Presentation: {ppt_path}")
-    print(f"PDF: {pdf_path}")
+    if charts and not formats:
+        print(f"Charts: {charts[0].path.parent}")
+    if "pptx" in paths:
+        print(f"Presentation: {paths['pptx']}")
+    if "pdf" in paths:
+        print(f"PDF: {paths['pdf']}")
+
+
+def _finish_run(profiler: RunProfiler, manifest_path: Path) -> None:
+    path = profiler.write_manifest(manifest_path)
+    print(f"[PROFILE] Stage timings (manifest: {path})")
+    print(profiler.summary())
+
+
+def run_pipeline(
+    folder: Union[str, Path] = INPUT_DIR,
+    stream: bool = False,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    cache: Optional[IngestCache] = None,
+    chart_workers: int = 1,
+    provider: Union[InsightProvider, str, None] = "openai",
+    llm_cache: Optional[ResponseCache] = None,
+    llm_timeout: float = DEFAULT_TIMEOUT,
+    partition_by: Optional[str] = None,
+    batch_workers: int = 1,
+    profiler: Optional[RunProfiler] = None,
+    manifest_path: Path = MANIFEST_PATH,
+    backend: str = "pandas",
+    rollups: Optional[RollupStore] = None,
+    sql_table: Optional[str] = None,
+    sketch_capacity: Optional[int] = None,
+    chart_cache_dir: Optional[Path] = CHART_CACHE_DIR,
+    stages: Sequence[str] = STAGES,
+    ingest_workers: int = 1,
+    cube_path: Optional[Path] = CUBE_PATH,
+    prompt_budget: int = DEFAULT_PROMPT_TOKENS,
+) -> None:
+    # with sql_table set, folder is the SQLite database holding that table;
+    # provider may be a get_provider name, and None keeps insights rule-based
+    folder = Path(folder)
+    if isinstance(provider, str):
+        provider = get_provider(provider)
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    profiler = profiler or RunProfiler()
+    profiler.metadata.update(
+        folder=str(folder),
+        stream=stream,
+        partition_by=partition_by,
+        chart_workers=chart_workers,
+        ingest_workers=ingest_workers,
+        backend=backend,
+        sql_table=sql_table,
+        sketch_capacity=sketch_capacity,
+        stages=list(stages),
+    )
+
+    if sql_table is not None:
+        print(f"[INGEST] Reading table {sql_table} from {folder}")
+    else:
+        print(f"[INGEST] Scanning {folder} for CSV/Excel/JSON files")
+
+    if backend == "polars":
+        import polars_backend
+
+        if not polars_backend.available():
+            print("[WARN] polars is not installed; falling back to the pandas backend")
+            backend = "pandas"
+
+    if stream:
+        aggregates = _aggregate_stream(folder, chunksize, profiler, sql_table, sketch_capacity)
+    elif sql_table is not None and partition_by is None:
+        aggregates = _aggregate_sql(folder, sql_table, chunksize, profiler)
+    elif backend == "polars":
+        print("[AGGREGATE] Scanning and aggregating with the lazy polars backend")
+        with profiler.stage("aggregate") as stage:
+            aggregates = polars_backend.aggregate_folder(folder)
+            stage.rows = aggregates.row_count if aggregates is not None else 0
+    else:
+        if sql_table is not None:
+            cleaned_df = _load_cleaned_sql(folder, sql_table, chunksize, profiler)
+        else:
+            cleaned_df = load_cleaned(folder, cache, profiler, ingest_workers)
+        if cleaned_df.empty:
+            aggregates = None
+        elif partition_by is not None:
+            from batch import run_batch
+
+            usages: List[PromptUsage] = []
+            with profiler.stage("batch", rows=len(cleaned_df)):
+                run_batch(
+                    cleaned_df,
+                    partition_by,
+                    OUTPUT_DIR / "partitions",
+                    workers=batch_workers,
+                    provider=provider,
+                    llm_cache=llm_cache,
+                    llm_timeout=llm_timeout,
+                    token_budget=prompt_budget,
+                    usages=usages,
+                )
+            _record_prompts(profiler, usages)
+            _finish_run(profiler, manifest_path)
+            return
+        else:
+            print("[AGGREGATE] Computing per-category and per-keyword statistics")
+            with profiler.stage("aggregate", rows=len(cleaned_df)):
+                aggregates = build_aggregates(cleaned_df, sketch_capacity)
+
+    if aggregates is None:
+        print("[ERROR] No data files found or loaded.")
+        return
+
+    profiler.metadata["rows"] = aggregates.row_count
+    build_reports(
+        aggregates,
+        chart_workers=chart_workers,
+        provider=provider,
+        llm_cache=llm_cache,
+        llm_timeout=llm_timeout,
+        profiler=profiler,
+        rollups=rollups,
+        chart_cache_dir=chart_cache_dir,
+        stages=stages,
+        cube_path=cube_path,
+        prompt_budget=prompt_budget,
+    )
+    _finish_run(profiler, manifest_path)
+
+
+def _stage_list(value: str) -> List[str]:
+    try:
+        return resolve_stages(stage.strip() for stage in value.split(",") if stage.strip())
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="InsightForge reporting pipeline")
+    parser.add_argument("folder", nargs="?", default=str(INPUT_DIR))
+    parser.add_argument(
+        "--stages",
+        type=_stage_list,
+        default=list(STAGES),
+        metavar="STAGE[,STAGE...]",
+        help=f"run only these stages ({', '.join(STAGES)}); stages they depend on "
+        "are added, e.g. 'insights' ingests and prints insights without charts or reports",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="read and aggregate input files chunk by chunk with bounded memory",
+    )
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument(
+        "--sql-table",
+        metavar="TABLE",
+        help="treat the positional path as a SQLite database and report on TABLE, "
+        "aggregating inside the database",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("pandas", "polars"),
+        default="pandas",
+        help="dataframe engine for ingestion and aggregation",
+    )
+    parser.add_argument(
+        "--sketch",
+        action="store_true",
+        help="track top keywords with Space-Saving and distinct users/keywords with "
+        "HyperLogLog in bounded memory instead of exact tables",
+    )
+    parser.add_argument("--sketch-capacity", type=int, default=DEFAULT_CAPACITY)
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always re-parse input files instead of using the columnar cache",
+    )
+    parser.add_argument(
+        "--clear-cache", action="store_true", help="drop every cached file before running"
+    )
+    parser.add_argument(
+        "--no-chart-cache",
+        action="store_true",
+        help="re-render every chart instead of reusing PNGs for unchanged chart data",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=MAX_CACHE_BYTES // 1024 ** 2,
+        help="evict least recently used cache entries above this size",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and re-report whenever files in the folder are added or changed",
+    )
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument(
+        "--ingest-workers",
+        type=int,
+        default=1,
+        help="read input files on this many threads (1 reads them one after another)",
+    )
+    parser.add_argument(
+        "--chart-workers",
+        type=int,
+        default=1,
+        help="render charts across this many processes (1 renders sequentially)",
+    )
+    parser.add_argument(
+        "--partition-by",
+        metavar="COLUMN",
+        help="write one report per distinct value of COLUMN under data/output/partitions",
+    )
+    parser.add_argument("--batch-workers", type=int, default=1)
+    parser.add_argument(
+        "--llm",
+        choices=("openai", "stub", "none"),
+        default="openai",
+        help="insight provider; falls back to rule-based insights when unavailable",
+    )
+    parser.add_argument("--llm-timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument(
+        "--prompt-budget",
+        type=int,
+        default=DEFAULT_PROMPT_TOKENS,
+        help="estimated tokens allowed for the data summary sent to the LLM",
+    )
+    parser.add_argument(
+        "--no-llm-cache", action="store_true", help="always call the provider, ignoring cached responses"
+    )
+    parser.add_argument(
+        "--profile",
+        action="append",
+        default=[],
+        metavar="STAGE",
+        help="wrap STAGE (ingest, clean, aggregate, insight, charts, reports, ...) in cProfile",
+    )
+    parser.add_argument("--manifest", type=Path, default=MANIFEST_PATH)
+    parser.add_argument(
+        "--rollup-db",
+        type=Path,
+        default=ROLLUP_PATH,
+        help="SQLite store of daily/weekly rollups used for week-over-week trends",
+    )
+    parser.add_argument(
+        "--no-rollups", action="store_true", help="do not read or update the rollup store"
+    )
+    parser.add_argument(
+        "--cube-db",
+        type=Path,
+        default=CUBE_PATH,
+        help="SQLite cube of category x keyword totals for drill-down queries (scripts/cube.py)",
+    )
+    parser.add_argument("--no-cube", action="store_true", help="do not write the cube")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="run a report service with warm worker processes instead of a single report",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--socket", type=Path, metavar="PATH", help="listen on a Unix socket instead of TCP"
+    )
+    parser.add_argument("--service-workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help="requests allowed to wait for a worker before new ones are rejected",
+    )
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        default=DEFAULT_REQUEST_TIMEOUT,
+        help="seconds a service request may queue and render before it fails",
+    )
+    parser.add_argument(
+        "--data-root",
+        type=Path,
+        help="folder that service ?path= datasets must be under (default: the input folder)",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    run_pipeline()
+    args = _parse_args()
+    ingest_cache = None
+    if not args.no_cache:
+        ingest_cache = IngestCache(max_bytes=args.cache_max_mb * 1024 ** 2)
+        if args.clear_cache:
+            print(f"[CACHE] Removed {ingest_cache.invalidate()} cached files")
+    if args.clear_cache:
+        from charts import evict_chart_cache
+
+        print(f"[CACHE] Removed {evict_chart_cache(max_files=0)} cached charts")
+        print(f"[CACHE] Removed {ResponseCache().invalidate()} cached insight responses")
+    report_options = dict(
+        chart_workers=args.chart_workers,
+        provider=get_provider(args.llm),
+        llm_cache=None if args.no_llm_cache else ResponseCache(),
+        llm_timeout=args.llm_timeout,
+        rollups=None if args.no_rollups else RollupStore(args.rollup_db),
+        chart_cache_dir=None if args.no_chart_cache else CHART_CACHE_DIR,
+        stages=args.stages,
+        cube_path=None if args.no_cube else args.cube_db,
+        prompt_budget=args.prompt_budget,
+    )
+    if args.partition_by and (args.stream or args.watch):
+        raise SystemExit("--partition-by cannot be combined with --stream or --watch")
+    if args.backend == "polars" and (args.stream or args.watch or args.partition_by):
+        raise SystemExit("--backend polars only supports single-report batch runs")
+    if args.sketch and args.backend == "polars":
+        raise SystemExit("--sketch is only supported by the pandas backend")
+    if args.sql_table and (args.watch or args.backend == "polars"):
+        raise SystemExit("--sql-table cannot be combined with --watch or --backend polars")
+    if args.partition_by and list(args.stages) != list(STAGES):
+        raise SystemExit("--stages only applies to single-report runs, not --partition-by")
+    if args.serve and (args.watch or args.partition_by):
+        raise SystemExit("--serve cannot be combined with --watch or --partition-by")
+    if args.serve:
+        serve(
+            ServiceConfig(
+                workers=args.service_workers,
+                queue_size=args.queue_size,
+                request_timeout=args.request_timeout,
+                llm=args.llm,
+                llm_timeout=args.llm_timeout,
+                llm_cache=not args.no_llm_cache,
+                chart_cache_dir=None if args.no_chart_cache else CHART_CACHE_DIR,
+                data_root=args.data_root or Path(args.folder),
+            ),
+            host=args.host,
+            port=args.port,
+            socket_path=args.socket,
+        )
+    elif args.watch:
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+        def _on_update(aggregates: DatasetAggregates) -> None:
+            profiler = RunProfiler(args.profile)
+            profiler.metadata.update(folder=args.folder, watch=True, rows=aggregates.row_count)
+            build_reports(aggregates, profiler=profiler, **report_options)
+            _finish_run(profiler, args.manifest)
+
+        watch(
+            args.folder,
+            _on_update,
+            interval=args.interval,
+            chunksize=args.chunksize,
+        )
+    else:
+        profiler = RunProfiler(args.profile)
+        profiler.record_startup(STARTED)
+        run_pipeline(
+            args.folder,
+            stream=args.stream,
+            chunksize=args.chunksize,
+            cache=ingest_cache,
+            partition_by=args.partition_by,
+            batch_workers=args.batch_workers,
+            profiler=profiler,
+            manifest_path=args.manifest,
+            backend=args.backend,
+            sql_table=args.sql_table,
+            sketch_capacity=args.sketch_capacity if args.sketch else None,
+            ingest_workers=args.ingest_workers,
+            **report_options,
+        )
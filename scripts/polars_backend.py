@@ -0,0 +1,189 @@
+from pathlib import Path
+from typing import List, Optional, Union
+
+import pandas as pd
+
+from aggregates import (
+    GROUP_COLUMNS,
+    METRIC_COLUMN,
+    MIN_BUCKET_ROWS,
+    SEGMENT_COLUMN,
+    TIMELINE_BUCKETS,
+    DatasetAggregates,
+    group_stats_from_partials,
+)
+from formats import JSON_SUFFIXES, is_json_lines
+from utils import list_input_files, read_file
+
+try:
+    import polars as pl  # type: ignore
+except ImportError:  # pragma: no cover
+    pl = None
+
+# Same tokens pandas.read_csv treats as missing, so both backends see the same nulls.
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+def available() -> bool:
+    return pl is not None
+
+
+def _scan_file(path: Path) -> Optional["pl.LazyFrame"]:
+    try:
+        if path.suffix.lower() == ".csv":
+            return pl.scan_csv(path, null_values=NA_VALUES, infer_schema_length=10_000)
+        if path.suffix.lower() in JSON_SUFFIXES and is_json_lines(path):
+            return pl.scan_ndjson(path, infer_schema_length=10_000)
+        # Excel and JSON arrays go through the pandas readers, which polars cannot
+        # scan lazily without extra engines; the plan is lazy from here on.
+        return pl.from_pandas(read_file(path)).lazy()
+    except Exception as e:
+        print(f"[WARN] Failed to read {path.name}: {e}")
+        return None
+
+
+def scan_folder(folder_path: Union[str, Path]) -> Optional["pl.LazyFrame"]:
+    frames = [frame for frame in map(_scan_file, list_input_files(folder_path)) if frame is not None]
+    if not frames:
+        return None
+    return pl.concat(frames, how="diagonal_relaxed") if len(frames) > 1 else frames[0]
+
+
+def _clean_expr(name: str, dtype: "pl.DataType") -> "pl.Expr":
+    if dtype.is_numeric():
+        return pl.col(name).fill_null(0)
+    return pl.col(name).cast(pl.Utf8).fill_null("N/A")
+
+
+def _date_column(schema: "pl.Schema") -> Optional[str]:
+    # clean_data parses any non-numeric column named like a date
+    for name, dtype in schema.items():
+        if dtype.is_temporal() or ("date" in name.lower() and not dtype.is_numeric()):
+            return name
+    return None
+
+
+def _bucket_expr(name: Optional[str], dtype: Optional["pl.DataType"]) -> "pl.Expr":
+    if name is not None:
+        column = pl.col(name)
+        if not dtype.is_temporal():
+            column = column.cast(pl.Utf8).str.to_datetime(strict=False)
+        return column.dt.truncate("1d").alias("bucket")
+    # aggregates.record_bucket_rows: MIN_BUCKET_ROWS doubled until the buckets
+    # number at most TIMELINE_BUCKETS
+    doublings = (pl.len() / (MIN_BUCKET_ROWS * TIMELINE_BUCKETS)).log(2).ceil().clip(0)
+    size = (pl.lit(2.0).pow(doublings) * MIN_BUCKET_ROWS).cast(pl.Int64)
+    return (pl.int_range(pl.len()) // size * size).alias("bucket")
+
+
+def _timeline_query(
+    cleaned: "pl.LazyFrame", metric: "pl.Expr", date_column: Optional[str], schema: "pl.Schema"
+) -> "pl.LazyFrame":
+    dtype = schema[date_column] if date_column is not None else None
+    return (
+        cleaned.with_columns(_bucket_expr(date_column, dtype))
+        .drop_nulls("bucket")
+        .group_by([SEGMENT_COLUMN, "bucket"])
+        .agg(pl.len().cast(pl.Int64).alias("count"), metric.sum().alias("sum"))
+        .sort([SEGMENT_COLUMN, "bucket"])
+    )
+
+
+def _daily_query(
+    cleaned: "pl.LazyFrame", metric: "pl.Expr", column: str, date_column: str, schema: "pl.Schema"
+) -> "pl.LazyFrame":
+    return (
+        cleaned.with_columns(_bucket_expr(date_column, schema[date_column]).alias("day"))
+        .drop_nulls("day")
+        .group_by([pl.col(column).alias("value"), "day"])
+        .agg(pl.len().cast(pl.Int64).alias("count"), metric.sum().alias("sum"))
+        .sort(["value", "day"])
+    )
+
+
+def aggregate_folder(folder_path: Union[str, Path]) -> Optional[DatasetAggregates]:
+    lazy = scan_folder(folder_path)
+    if lazy is None:
+        return None
+
+    schema = lazy.collect_schema()
+    columns = schema.names()
+    numeric_column = next((name for name in columns if schema[name].is_numeric()), None)
+    has_activity = METRIC_COLUMN in schema
+    group_columns = [column for column in GROUP_COLUMNS if column in schema]
+    has_timeline = has_activity and SEGMENT_COLUMN in schema
+    date_column = _date_column(schema) if has_timeline else None
+
+    # Projection pushdown: only the columns the insights and charts read are parsed.
+    needed: List[str] = list(dict.fromkeys(
+        group_columns
+        + ([METRIC_COLUMN] if has_activity else [])
+        + ([numeric_column] if numeric_column else [])
+        + ([date_column] if date_column else [])
+    ))
+    cleaned = lazy.select(
+        [
+            pl.col(name) if name == date_column else _clean_expr(name, schema[name])
+            for name in needed
+        ]
+    )
+
+    queries = [cleaned.select(pl.len().alias("rows"))]
+    metric = pl.col(METRIC_COLUMN).cast(pl.Float64)
+    if has_activity:
+        queries.append(cleaned.select(metric.sum().alias("sum")))
+    partials = [pl.len().cast(pl.Int64).alias("count")]
+    if has_activity:
+        partials += [metric.sum().alias("sum"), (metric * metric).sum().alias("sum_sq")]
+    for column in group_columns:
+        queries.append(cleaned.group_by(column).agg(partials).sort(column))
+    has_cube = len(group_columns) == len(GROUP_COLUMNS)
+    if has_cube:
+        cube_keys = list(GROUP_COLUMNS)
+        queries.append(cleaned.group_by(cube_keys).agg(partials).sort(cube_keys))
+    if has_timeline:
+        queries.append(_timeline_query(cleaned, metric, date_column, schema))
+    daily_columns = group_columns if date_column else []
+    for column in daily_columns:
+        queries.append(_daily_query(cleaned, metric, column, date_column, schema))
+    if numeric_column:
+        queries.append(cleaned.select(numeric_column))
+
+    # collect_all runs the plans together and shares the common scan.
+    results = pl.collect_all(queries)
+    row_count = int(results[0]["rows"][0]) if results[0].height else 0
+    if row_count == 0:
+        return None
+
+    aggregates = DatasetAggregates(row_count=row_count, columns=columns)
+    offset = 1
+    if has_activity:
+        aggregates.activity_rows = row_count
+        aggregates.activity_sum = float(results[1]["sum"][0] or 0.0)
+        aggregates.activity_mean = aggregates.activity_sum / row_count
+        offset = 2
+    for column in group_columns:
+        table = results[offset].to_pandas().set_index(column)
+        aggregates.groups[column] = group_stats_from_partials(column, table)
+        offset += 1
+    if has_cube:
+        aggregates.cube = results[offset].to_pandas().set_index(list(GROUP_COLUMNS))
+        offset += 1
+    if has_timeline:
+        timeline = results[offset].to_pandas().rename(columns={SEGMENT_COLUMN: "segment"})
+        aggregates.timeline = timeline.set_index(["segment", "bucket"])
+        aggregates.timeline_kind = "date" if date_column else "record"
+        offset += 1
+    if daily_columns:
+        tables = [
+            results[offset + idx].to_pandas().set_index(["value", "day"])
+            for idx in range(len(daily_columns))
+        ]
+        aggregates.daily = pd.concat(tables, keys=daily_columns, names=["dimension"])
+    if numeric_column:
+        aggregates.numeric_column = numeric_column
+        aggregates.numeric_series = results[-1][numeric_column].to_pandas()
+    return aggregates
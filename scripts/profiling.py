@@ -0,0 +1,121 @@
+import cProfile
+import json
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+try:
+    import resource
+except ImportError:  # Windows; peak memory is then reported as unavailable
+    resource = None
+
+MANIFEST_PATH = Path("data") / "output" / "run_manifest.json"
+PROFILE_DIR = Path("data") / "output" / "profiles"
+
+
+def _max_rss_mb(children: bool = False) -> Optional[float]:
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+@dataclass
+class StageTiming:
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    rows: Optional[int] = None
+    rows_per_s: Optional[float] = None
+    max_rss_mb: Optional[float] = None
+    children_max_rss_mb: Optional[float] = None
+    profile: Optional[str] = None
+
+
+class RunProfiler:
+    def __init__(
+        self,
+        profile_stages: Iterable[str] = (),
+        profile_dir: Union[str, Path] = PROFILE_DIR,
+    ) -> None:
+        self.profile_stages = set(profile_stages)
+        self.profile_dir = Path(profile_dir)
+        self.stages: List[StageTiming] = []
+        self.charts: List[StageTiming] = []
+        self.metadata: Dict[str, object] = {}
+        self.started = datetime.now()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None) -> Iterator[StageTiming]:
+        timing = StageTiming(name, rows=rows)
+        profiler = cProfile.Profile() if name in self.profile_stages else None
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield timing
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                profile_path = self.profile_dir / f"{name}.prof"
+                profiler.dump_stats(str(profile_path))
+                timing.profile = str(profile_path)
+            timing.wall_s = time.perf_counter() - wall_start
+            timing.cpu_s = time.process_time() - cpu_start
+            self._finish(timing)
+            self.stages.append(timing)
+
+    def _finish(self, timing: StageTiming) -> None:
+        if timing.rows is not None and timing.wall_s > 0:
+            timing.rows_per_s = timing.rows / timing.wall_s
+        timing.max_rss_mb = _max_rss_mb()
+        timing.children_max_rss_mb = _max_rss_mb(children=True)
+
+    def record_startup(self, started: float) -> None:
+        # Wall time from `started` (a perf_counter reading taken as the entry
+        # script began importing) to this profiler, and all CPU time before it.
+        timing = StageTiming("startup", wall_s=self._wall_start - started, cpu_s=self._cpu_start)
+        self._finish(timing)
+        self.stages.insert(0, timing)
+
+    def record_chart(self, name: str, wall_s: float, cpu_s: float) -> None:
+        timing = StageTiming(name, wall_s=wall_s, cpu_s=cpu_s)
+        self._finish(timing)
+        self.charts.append(timing)
+
+    def manifest(self) -> Dict[str, object]:
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "wall_s": time.perf_counter() - self._wall_start,
+            "cpu_s": time.process_time() - self._cpu_start,
+            "max_rss_mb": _max_rss_mb(),
+            "children_max_rss_mb": _max_rss_mb(children=True),
+            "metadata": self.metadata,
+            "stages": [asdict(timing) for timing in self.stages],
+            "charts": [asdict(timing) for timing in self.charts],
+        }
+
+    def write_manifest(self, path: Union[str, Path] = MANIFEST_PATH) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.manifest(), indent=2, default=str), encoding="utf-8")
+        return path
+
+    def summary(self) -> str:
+        lines = []
+        for timing in self.stages:
+            rate = f", {timing.rows_per_s:,.0f} rows/s" if timing.rows_per_s else ""
+            lines.append(
+                f"  {timing.name:<12} {timing.wall_s:7.2f}s wall {timing.cpu_s:7.2f}s cpu{rate}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,98 @@
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Tokens allowed for the data section of an insight prompt.
+DEFAULT_PROMPT_TOKENS = 600
+# Salience of items that are kept whatever the budget.
+ESSENTIAL = math.inf
+
+# Letter, digit and symbol runs. BPE vocabularies keep common words whole and
+# merge JSON punctuation such as '":"', so each run costs about one token per
+# CHARS_PER_TOKEN letters, DIGITS_PER_TOKEN digits or SYMBOLS_PER_TOKEN symbols.
+_PIECES = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]+")
+CHARS_PER_TOKEN = 5
+DIGITS_PER_TOKEN = 3
+SYMBOLS_PER_TOKEN = 2
+
+
+def estimate_tokens(text: str) -> int:
+    # A local, dependency-free stand-in for the model's tokenizer. It tends to
+    # overestimate slightly, which errs on the side of the budget.
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        if piece[0].isdigit():
+            per_token = DIGITS_PER_TOKEN
+        elif piece[0].isalpha():
+            per_token = CHARS_PER_TOKEN
+        else:
+            per_token = SYMBOLS_PER_TOKEN
+        tokens += -(-len(piece) // per_token)
+    return tokens
+
+
+@dataclass
+class PromptItem:
+    key: str
+    # JSON-serialisable; list and dict entries are ordered most salient first
+    value: Any
+    salience: float
+
+
+@dataclass
+class PromptUsage:
+    token_budget: int
+    prompt_tokens: int = 0
+    prompt_chars: int = 0
+    kept: List[str] = field(default_factory=list)
+    dropped: List[str] = field(default_factory=list)
+    latency_s: Optional[float] = None
+    cached: bool = False
+    succeeded: bool = False
+
+
+def to_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _truncated(value: Any, size: int) -> Any:
+    if isinstance(value, dict):
+        return dict(list(value.items())[:size])
+    return value[:size]
+
+
+def _fitted(chosen: Dict[str, Any], item: PromptItem, budget: int) -> Optional[Any]:
+    # The item's value, or its longest prefix, that keeps the summary in budget.
+    def fits(value: Any) -> bool:
+        return estimate_tokens(to_json({**chosen, item.key: value})) <= budget
+
+    if item.salience == ESSENTIAL or fits(item.value):
+        return item.value
+    if not isinstance(item.value, (list, dict)) or len(item.value) < 2:
+        return None
+    low, high = 0, len(item.value) - 1  # binary search for the longest prefix
+    while low < high:
+        size = (low + high + 1) // 2
+        if fits(_truncated(item.value, size)):
+            low = size
+        else:
+            high = size - 1
+    return _truncated(item.value, low) if low else None
+
+
+def compact_metrics(
+    items: List[PromptItem], budget: int = DEFAULT_PROMPT_TOKENS
+) -> Tuple[Dict[str, Any], List[str]]:
+    # Greedy by salience: each item goes in whole, shortened, or not at all.
+    # Returns the summary (most salient first) and the keys left out.
+    chosen: Dict[str, Any] = {}
+    dropped: List[str] = []
+    for item in sorted(items, key=lambda item: -item.salience):
+        value = _fitted(chosen, item, budget)
+        if value is None:
+            dropped.append(item.key)
+        else:
+            chosen[item.key] = value
+    return chosen, dropped
@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional, Union
+
+LLM_CACHE_DIR = Path("data") / "cache" / "llm"
+LLM_CACHE_MAX_BYTES = 64 * 1024 ** 2
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 2
+SECTION_KEYS = ("overview", "key_metrics", "trends", "anomalies", "recommendations", "summary")
+
+
+class InsightProvider(ABC):
+    name = "base"
+
+    @property
+    def cache_id(self) -> str:
+        return self.name
+
+    @abstractmethod
+    async def complete(self, prompt: str) -> str:
+        ...
+
+
+def _openai():
+    # The SDK is slow to import, so it is loaded on the first completion.
+    import openai  # type: ignore
+
+    return openai
+
+
+class OpenAIProvider(InsightProvider):
+    name = "openai"
+
+    def __init__(self, model: str = "gpt-4o-mini", temperature: float = 0.4) -> None:
+        self.model = model
+        self.temperature = temperature
+
+    @property
+    def cache_id(self) -> str:
+        return f"{self.name}:{self.model}:{self.temperature}"
+
+    async def complete(self, prompt: str) -> str:
+        completion = await _openai().ChatCompletion.acreate(  # type: ignore[attr-defined]
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are an executive insights generator."},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=self.temperature,
+            max_tokens=600,
+        )
+        return completion.choices[0].message["content"]  # type: ignore[index]
+
+
+# Offline provider returning canned sections, for tests and dry runs.
+class StubProvider(InsightProvider):
+    name = "stub"
+
+    def __init__(self, delay: float = 0.0, response: Optional[str] = None) -> None:
+        self.delay = delay
+        self.response = response
+
+    async def complete(self, prompt: str) -> str:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.response is not None:
+            return self.response
+        tag = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        return json.dumps({key: [f"Stub {key.replace('_', ' ')} ({tag})."] for key in SECTION_KEYS})
+
+
+def get_provider(name: str) -> Optional[InsightProvider]:
+    if name == "none":
+        return None
+    if name == "stub":
+        return StubProvider()
+    if name == "openai":
+        return OpenAIProvider() if importlib.util.find_spec("openai") is not None else None
+    raise ValueError(f"Unknown insight provider: {name}")
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        directory: Union[str, Path] = LLM_CACHE_DIR,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def key(self, provider: InsightProvider, prompt: str) -> str:
+        payload = f"{provider.cache_id}\n{prompt}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def entries(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return list(self.directory.glob("*.json"))
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.directory / f"{key}.json"
+        try:
+            content = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        # mtime doubles as the last-access time for LRU eviction
+        os.utime(path)
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{key}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(content, encoding="utf-8")
+        tmp.replace(path)
+        self.evict()
+
+    def invalidate(self) -> int:
+        removed = 0
+        for entry in self.entries():
+            entry.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def evict(self) -> int:
+        entries = sorted(self.entries(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        removed = 0
+        while entries and total > self.max_bytes:
+            oldest = entries.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink(missing_ok=True)
+            removed += 1
+        return removed
@@ -0,0 +1,64 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Optional, Sequence
+
+from generate_pdf import render_pdf
+from generate_slides import render_presentation
+from report import REPORT_NAME, ReportModel
+
+OUTPUT_DIR = Path("data") / "output"
+
+Renderer = Callable[[ReportModel, BinaryIO], None]
+# Keyed by file suffix. A new format is one render_<format>(model, stream)
+# function added here.
+RENDERERS: Dict[str, Renderer] = {
+    "pptx": render_presentation,
+    "pdf": render_pdf,
+}
+
+
+def _renderer(fmt: str) -> Renderer:
+    try:
+        return RENDERERS[fmt]
+    except KeyError:
+        raise ValueError(f"Unknown report format '{fmt}'; expected one of {sorted(RENDERERS)}")
+
+
+def _render_bytes(model: ReportModel, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    _renderer(fmt)(model, buffer)
+    return buffer.getvalue()
+
+
+def _render_file(model: ReportModel, fmt: str, path: Path) -> Path:
+    renderer = _renderer(fmt)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as stream:
+        renderer(model, stream)
+    return path
+
+
+def render_reports(
+    model: ReportModel, formats: Optional[Sequence[str]] = None
+) -> Dict[str, bytes]:
+    # In-memory documents, e.g. for streaming back from a service.
+    formats = list(formats or RENDERERS)
+    with ThreadPoolExecutor(max_workers=len(formats)) as pool:
+        futures = {fmt: pool.submit(_render_bytes, model, fmt) for fmt in formats}
+        return {fmt: future.result() for fmt, future in futures.items()}
+
+
+def write_reports(
+    model: ReportModel,
+    output_dir: Path = OUTPUT_DIR,
+    formats: Optional[Sequence[str]] = None,
+    name: str = REPORT_NAME,
+) -> Dict[str, Path]:
+    formats = list(formats or RENDERERS)
+    with ThreadPoolExecutor(max_workers=len(formats)) as pool:
+        futures = {
+            fmt: pool.submit(_render_file, model, fmt, output_dir / f"{name}.{fmt}")
+            for fmt in formats
+        }
+        return {fmt: future.result() for fmt, future in futures.items()}
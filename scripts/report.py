@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from insights import InsightSections
+
+if TYPE_CHECKING:
+    # charts pulls in matplotlib, which the model itself never needs
+    from charts import ChartArtifact
+
+REPORT_TITLE = "InsightForge Executive Brief"
+REPORT_NAME = "InsightForge_Report"
+
+# InsightSections field -> heading used by renderers without a layout of their own
+SECTION_TITLES = {
+    "overview": "Overview",
+    "key_metrics": "Key Metrics",
+    "trends": "Trend Diagnostics",
+    "anomalies": "Anomalies & Watchouts",
+    "recommendations": "Strategic Recommendations",
+    "summary": "Closing Summary",
+}
+
+
+@dataclass
+class ReportSection:
+    key: str
+    title: str
+    bullets: List[str]
+
+
+@dataclass
+class ReportModel:
+    # Everything a report shows, built once and shared by every output format.
+    title: str
+    generated: datetime
+    sections: Dict[str, ReportSection]
+    charts: List[ChartArtifact]
+
+    @property
+    def timestamp(self) -> str:
+        return self.generated.strftime("%d %b %Y %H:%M")
+
+    def bullets(self, key: str, limit: Optional[int] = None) -> List[str]:
+        section = self.sections.get(key)
+        if section is None:
+            return []
+        return section.bullets[:limit] if limit is not None else list(section.bullets)
+
+
+def build_report_model(
+    insights: InsightSections,
+    charts: List[ChartArtifact],
+    generated: Optional[datetime] = None,
+) -> ReportModel:
+    sections = {
+        key: ReportSection(key, title, [b for b in getattr(insights, key) if b.strip()])
+        for key, title in SECTION_TITLES.items()
+    }
+    return ReportModel(REPORT_TITLE, generated or datetime.now(), sections, list(charts))
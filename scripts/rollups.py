@@ -0,0 +1,202 @@
+import sqlite3
+from contextlib import closing
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List, Optional, Union
+
+import pandas as pd
+
+from aggregates import DatasetAggregates
+
+ROLLUP_PATH = Path("data") / "rollups" / "rollups.db"
+# Portfolio-wide totals are stored alongside the per-value rows.
+TOTAL_DIMENSION = "__total__"
+# Values need this many rows in both weeks before their movement is reported.
+MIN_WEEKLY_VOLUME = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT NOT NULL,
+    week TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    PRIMARY KEY (day, dimension, value)
+);
+CREATE INDEX IF NOT EXISTS daily_week ON daily (week);
+CREATE TABLE IF NOT EXISTS weekly (
+    week TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    PRIMARY KEY (week, dimension, value)
+);
+"""
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def rollup_partials(aggregates: DatasetAggregates, as_of: Optional[date] = None) -> pd.DataFrame:
+    # Dated data is rolled up by its own days. Undated inputs are treated as
+    # the snapshot for the run's week, so re-running within a week replaces
+    # the snapshot instead of adding to it.
+    columns = ["day", "dimension", "value", "count", "sum"]
+    if not aggregates.has_activity:
+        return pd.DataFrame(columns=columns)
+    if aggregates.daily is not None and not aggregates.daily.empty:
+        rows = aggregates.daily.reset_index()
+        # every row is counted once per dimension, so any one of them gives the totals
+        first = rows[rows["dimension"] == rows["dimension"].iloc[0]]
+        totals = first.groupby("day", as_index=False)[["count", "sum"]].sum()
+        totals.insert(0, "dimension", TOTAL_DIMENSION)
+        totals.insert(1, "value", "")
+        rows = pd.concat([rows, totals[rows.columns]], ignore_index=True)
+        rows["day"] = pd.to_datetime(rows["day"]).dt.date
+        return rows[columns]
+
+    day = week_start(as_of or date.today())
+    frames = [
+        pd.DataFrame(
+            {
+                "dimension": TOTAL_DIMENSION,
+                "value": [""],
+                "count": [aggregates.activity_rows],
+                "sum": [aggregates.activity_sum],
+            }
+        )
+    ]
+    for column, stats in aggregates.groups.items():
+        table = stats.table[["count", "sum"]].reset_index()
+        table.columns = ["value", "count", "sum"]
+        table["value"] = table["value"].astype(str)
+        table.insert(0, "dimension", column)
+        frames.append(table)
+    rows = pd.concat(frames, ignore_index=True)
+    rows.insert(0, "day", day)
+    return rows[columns]
+
+
+class RollupStore:
+    def __init__(self, path: Union[str, Path] = ROLLUP_PATH) -> None:
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def record(self, aggregates: DatasetAggregates, as_of: Optional[date] = None) -> int:
+        rows = rollup_partials(aggregates, as_of)
+        if rows.empty:
+            return 0
+        rows["week"] = rows["day"].map(week_start)
+        days = sorted({day.isoformat() for day in rows["day"]})
+        weeks = sorted({week.isoformat() for week in rows["week"]})
+        records = [
+            (day.isoformat(), week.isoformat(), dimension, value, int(count), float(total))
+            for day, week, dimension, value, count, total in rows[
+                ["day", "week", "dimension", "value", "count", "sum"]
+            ].itertuples(index=False, name=None)
+        ]
+        with closing(self._connect()) as conn, conn:
+            # The latest run is authoritative for every day it covers.
+            conn.executemany("DELETE FROM daily WHERE day = ?", [(day,) for day in days])
+            conn.executemany(
+                "INSERT INTO daily (day, week, dimension, value, count, sum) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            for week in weeks:
+                conn.execute("DELETE FROM weekly WHERE week = ?", (week,))
+                conn.execute(
+                    "INSERT INTO weekly (week, dimension, value, count, sum) "
+                    "SELECT week, dimension, value, SUM(count), SUM(sum) FROM daily "
+                    "WHERE week = ? GROUP BY week, dimension, value",
+                    (week,),
+                )
+        print(f"[ROLLUP] Stored {len(records):,} rows across {len(days)} day(s) in {self.path}")
+        return len(records)
+
+    def latest_week(self, as_of: Optional[date] = None) -> Optional[date]:
+        if not self.path.exists():
+            return None
+        query = "SELECT MAX(week) FROM weekly"
+        params: tuple = ()
+        if as_of is not None:
+            query += " WHERE week <= ?"
+            params = (week_start(as_of).isoformat(),)
+        with closing(self._connect()) as conn:
+            (latest,) = conn.execute(query, params).fetchone()
+        return date.fromisoformat(latest) if latest else None
+
+    def week_over_week(self, dimension: str, as_of: Optional[date] = None) -> pd.DataFrame:
+        # indexed by value; columns: count, prev_count, rate, prev_rate,
+        # volume_change_pct, rate_change_pts
+        current = self.latest_week(as_of)
+        if current is None:
+            return pd.DataFrame()
+        previous = current - timedelta(days=7)
+        with closing(self._connect()) as conn:
+            table = pd.read_sql_query(
+                "SELECT week, value, count, sum FROM weekly WHERE dimension = ? AND week IN (?, ?)",
+                conn,
+                params=(dimension, current.isoformat(), previous.isoformat()),
+            )
+        if table.empty:
+            return pd.DataFrame()
+        wide = table.pivot(index="value", columns="week", values=["count", "sum"])
+        this_week, last_week = current.isoformat(), previous.isoformat()
+        if last_week not in wide["count"].columns:
+            return pd.DataFrame()
+        count = wide["count"][this_week]
+        prev_count = wide["count"][last_week]
+        rate = wide["sum"][this_week] / count
+        prev_rate = wide["sum"][last_week] / prev_count
+        result = pd.DataFrame(
+            {
+                "count": count,
+                "prev_count": prev_count,
+                "rate": rate,
+                "prev_rate": prev_rate,
+                "volume_change_pct": (count - prev_count) / prev_count * 100,
+                "rate_change_pts": (rate - prev_rate) * 100,
+            }
+        )
+        return result.dropna()
+
+
+def describe_trends(
+    store: RollupStore,
+    as_of: Optional[date] = None,
+    dimension: str = "category",
+    limit: int = 2,
+) -> List[str]:
+    lines: List[str] = []
+    totals = store.week_over_week(TOTAL_DIMENSION, as_of)
+    if not totals.empty:
+        total = totals.iloc[0]
+        direction = "rose" if total["rate_change_pts"] >= 0 else "fell"
+        lines.append(
+            f"Week over week, activity rate {direction} {abs(total['rate_change_pts']):.1f} pts "
+            f"to {total['rate'] * 100:.1f}% (volume {total['volume_change_pct']:+.0f}%)."
+        )
+
+    table = store.week_over_week(dimension, as_of)
+    if table.empty:
+        return lines
+    steady = (table["count"] >= MIN_WEEKLY_VOLUME) & (table["prev_count"] >= MIN_WEEKLY_VOLUME)
+    movers = table.loc[steady, "rate_change_pts"].sort_values(kind="stable")
+    for value, change in movers.iloc[::-1].head(limit).items():
+        if change > 0:
+            lines.append(f"{value} is gaining: activation up {change:.1f} pts week over week.")
+    for value, change in movers.head(limit).items():
+        if change < 0:
+            lines.append(
+                f"{value} is slipping: activation down {abs(change):.1f} pts week over week."
+            )
+    return lines
@@ -0,0 +1,215 @@
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from aggregates import METRIC_COLUMN
+from formats import EXCEL_ENGINE, JSON_SUFFIXES, is_json_lines
+
+SNIFF_ROWS = 1_000
+# JSON arrays cannot be read partially by pandas, so a prefix is decoded instead.
+SNIFF_BYTES = 1 << 20
+DATE_PARSE_RATIO = 0.9
+# Text columns at most this distinct are read straight into categoricals.
+CATEGORY_MAX_RATIO = 0.5
+
+FAMILIES = {
+    "bool": "numeric",
+    "int": "numeric",
+    "float": "numeric",
+    "datetime": "datetime",
+    "category": "text",
+    "text": "text",
+}
+# Columns whose type is known up front; everything else is inferred per source.
+DECLARED_KINDS: Dict[str, str] = {METRIC_COLUMN: "int", "user_id": "int", "User_id": "int"}
+# Declared numeric kinds are read with nullable dtypes, so a gap stays a gap.
+NULLABLE_DTYPES = {"int": "Int64", "bool": "boolean"}
+
+
+@dataclass
+class Schema:
+    # column -> kind, one of FAMILIES
+    kinds: Dict[str, str] = field(default_factory=dict)
+    # column -> kind fixed by the registry, for the columns present
+    declared: Dict[str, str] = field(default_factory=dict)
+
+    def dates(self) -> List[str]:
+        return [name for name, kind in self.kinds.items() if kind == "datetime"]
+
+    def dtypes(self) -> Dict[str, str]:
+        # Inferred numeric columns keep pandas' own parsing: declaring them would
+        # fail the whole file on a stray token the sample did not contain. Declared
+        # ones are trusted, as long as the sample agrees with the declaration.
+        mapping = {"category": "category", "text": "str"}
+        dtypes = {name: mapping[kind] for name, kind in self.kinds.items() if kind in mapping}
+        for name, kind in self.kinds.items():
+            if kind in NULLABLE_DTYPES and self.declared.get(name) == kind:
+                dtypes[name] = NULLABLE_DTYPES[kind]
+        return dtypes
+
+    def read_options(self, suffix: str) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"dtype": self.dtypes()}
+        dates = self.dates()
+        if dates:
+            options["convert_dates" if suffix in JSON_SUFFIXES else "parse_dates"] = dates
+        return options
+
+    def restrict(self, columns) -> "Schema":
+        return Schema(
+            {name: kind for name, kind in self.kinds.items() if name in columns},
+            {name: kind for name, kind in self.declared.items() if name in columns},
+        )
+
+
+def infer_kind(name: str, series: pd.Series) -> Optional[str]:
+    values = series.dropna()
+    if values.empty:
+        return None  # nothing to go on; compatible with any kind
+    if values.map(lambda value: isinstance(value, (dict, list))).any():
+        return "text"  # nested JSON values; pandas keeps them as objects
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series):
+        return "int"
+    if pd.api.types.is_float_dtype(series):
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    if "date" in name.lower():
+        parsed = pd.to_datetime(values.astype(str), errors="coerce", format="mixed")
+        if parsed.notna().mean() >= DATE_PARSE_RATIO:
+            return "datetime"
+    if values.nunique() <= CATEGORY_MAX_RATIO * len(series):
+        return "category"
+    return "text"
+
+
+def _sniff_json(path: Path) -> Optional[pd.DataFrame]:
+    # Decodes the leading records of a records-oriented array (or JSON lines).
+    # Other layouts, such as pandas' column-oriented default, have no record
+    # prefix to sample and are left to pandas' inference.
+    with open(path, encoding="utf-8") as handle:
+        text = handle.read(SNIFF_BYTES)
+    decoder = json.JSONDecoder()
+    index = len(text) - len(text.lstrip())
+    if text[index:index + 1] == "[":
+        index += 1
+    elif not is_json_lines(path):
+        return None
+    records: List[dict] = []
+    while len(records) < SNIFF_ROWS:
+        while index < len(text) and text[index] in " \t\r\n,":
+            index += 1
+        if index >= len(text) or text[index] == "]":
+            break
+        try:
+            record, index = decoder.raw_decode(text, index)
+        except ValueError:
+            break  # the sample ended mid-record
+        if not isinstance(record, dict):
+            return None
+        records.append(record)
+    return pd.DataFrame.from_records(records) if records else None
+
+
+def sniff_sample(path: Path) -> Optional[pd.DataFrame]:
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return pd.read_csv(path, nrows=SNIFF_ROWS)
+    if suffix == ".xlsx":
+        return pd.read_excel(path, nrows=SNIFF_ROWS, engine=EXCEL_ENGINE)
+    if suffix in JSON_SUFFIXES:
+        return _sniff_json(path)
+    return None
+
+
+def _merge_kinds(kinds: List[str]) -> str:
+    # widest kind within one family
+    for kind in ("float", "int", "bool", "datetime", "text", "category"):
+        if kind in kinds:
+            return kind
+    return kinds[0]
+
+
+class SchemaRegistry:
+    def __init__(self, declared: Optional[Dict[str, str]] = None) -> None:
+        self.declared = dict(DECLARED_KINDS if declared is None else declared)
+        self._sniffed: Dict[Tuple[str, int, int], Optional[Schema]] = {}
+
+    def sniff(self, path: Path) -> Optional[Schema]:
+        # Sampled once per source version; None when the format cannot be sampled.
+        try:
+            stat = path.stat()
+        except OSError as e:
+            print(f"[WARN] Could not sample {path.name}: {e}")
+            return None
+        key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+        if key not in self._sniffed:
+            schema = None
+            try:
+                sample = sniff_sample(path)
+                if sample is not None:
+                    kinds = {
+                        str(name): infer_kind(str(name), sample[name]) for name in sample.columns
+                    }
+                    schema = Schema(
+                        {name: kind for name, kind in kinds.items() if kind}, self._declared(kinds)
+                    )
+            except Exception as e:
+                # the file is then read with pandas' own inference
+                print(f"[WARN] Could not sample {path.name}: {e}")
+            self._sniffed[key] = schema
+        return self._sniffed[key]
+
+    def _declared(self, columns) -> Dict[str, str]:
+        return {name: kind for name, kind in self.declared.items() if name in columns}
+
+    def expected_families(self, schemas: List[Schema]) -> Dict[str, str]:
+        votes: Dict[str, Counter] = {}
+        for schema in schemas:
+            for name, kind in schema.kinds.items():
+                votes.setdefault(name, Counter())[FAMILIES[kind]] += 1
+        expected = {name: counter.most_common(1)[0][0] for name, counter in votes.items()}
+        expected.update({name: FAMILIES[kind] for name, kind in self.declared.items()})
+        return expected
+
+    def check(self, files: List[Path]) -> Tuple[List[Path], Schema, Dict[Path, str]]:
+        # Rejects files whose sampled types contradict the other sources, before
+        # any of them is loaded in full, and returns one schema for the rest
+        # along with the reason each rejected file was left out.
+        sniffed = {file: self.sniff(file) for file in files}
+        expected = self.expected_families([s for s in sniffed.values() if s is not None])
+        accepted: List[Path] = []
+        rejected: Dict[Path, str] = {}
+        kinds: Dict[str, List[str]] = {}
+        for file, schema in sniffed.items():
+            problems = [] if schema is None else [
+                f"'{name}' is {FAMILIES[kind]} but {expected[name]} elsewhere"
+                for name, kind in schema.kinds.items()
+                # any value can be read as text, so only typed columns conflict
+                if FAMILIES[kind] != expected[name] and expected[name] != "text"
+            ]
+            if problems:
+                rejected[file] = "; ".join(problems)
+                continue
+            accepted.append(file)
+            for name, kind in (schema.kinds.items() if schema is not None else ()):
+                read_as = kind if FAMILIES[kind] == expected[name] else "text"
+                kinds.setdefault(name, []).append(read_as)
+        merged = Schema(
+            {name: _merge_kinds(found) for name, found in kinds.items()}, self._declared(kinds)
+        )
+        return accepted, merged, rejected
+
+    def validate(self, files: List[Path]) -> Tuple[List[Path], Schema]:
+        accepted, schema, rejected = self.check(files)
+        for file, reason in rejected.items():
+            print(f"[WARN] Skipping {file.name}: {reason}")
+        return accepted, schema
+
+
+REGISTRY = SchemaRegistry()
@@ -0,0 +1,347 @@
+import io
+import json
+import os
+import socketserver
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from aggregates import build_aggregates
+from cache import CHART_CACHE_DIR
+from insights import generate_llm_insights
+from providers import DEFAULT_TIMEOUT, ResponseCache, get_provider
+from report import REPORT_NAME, build_report_model
+from schema import REGISTRY
+from utils import READERS, clean_data, list_input_files, read_file
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_REQUEST_TIMEOUT = 120.0
+MAX_UPLOAD_BYTES = 200 * 1024 ** 2
+DEFAULT_DATA_ROOT = Path("data") / "input"
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "zip": "application/zip",
+}
+
+# Dataset = a file or folder path on the service host, or (suffix, uploaded bytes)
+Dataset = Tuple[Optional[str], Optional[str], Optional[bytes]]
+
+# per-process state, set once by _warm_worker
+_WORKER: Dict[str, object] = {}
+
+
+@dataclass
+class ServiceConfig:
+    workers: int = DEFAULT_WORKERS
+    queue_size: int = DEFAULT_QUEUE_SIZE
+    request_timeout: float = DEFAULT_REQUEST_TIMEOUT
+    llm: str = "none"
+    llm_timeout: float = DEFAULT_TIMEOUT
+    llm_cache: bool = True
+    chart_cache_dir: Optional[Path] = CHART_CACHE_DIR
+    # ?path= datasets must resolve to somewhere under this folder
+    data_root: Path = DEFAULT_DATA_ROOT
+
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _warm_worker(
+    llm: str, llm_timeout: float, llm_cache: bool, chart_cache_dir: Optional[Path]
+) -> None:
+    # Pay the import, font discovery and provider setup once per process.
+    from matplotlib import font_manager
+
+    from charts import STYLE
+    from generate_pdf import InsightPDF
+
+    font_manager.findfont(STYLE["font.family"])
+    pdf = InsightPDF()
+    pdf.add_page()
+    for style in ("", "B", "I"):
+        pdf.set_font("Helvetica", style, 12)
+    _WORKER.update(
+        provider=get_provider(llm),
+        llm_cache=ResponseCache() if llm_cache else None,
+        llm_timeout=llm_timeout,
+        chart_cache_dir=chart_cache_dir,
+    )
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def _load_dataset(dataset: Dataset) -> pd.DataFrame:
+    path, suffix, payload = dataset
+    if payload is not None:
+        frames = [READERS[suffix](io.BytesIO(payload))]
+    else:
+        source = Path(path)
+        sources = [source] if source.is_file() else list_input_files(source)
+        files, schema = REGISTRY.validate(sources)
+        frames = [read_file(file, schema) for file in files]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        raise ValueError("dataset has no rows")
+    return clean_data(pd.concat(frames, ignore_index=True))
+
+
+def _render_dataset(dataset: Dataset) -> Dict[str, bytes]:
+    from charts import generate_charts
+    from renderers import render_reports
+
+    aggregates = build_aggregates(_load_dataset(dataset))
+    insights = generate_llm_insights(
+        aggregates,
+        _WORKER.get("provider"),
+        _WORKER.get("llm_cache"),
+        _WORKER.get("llm_timeout", DEFAULT_TIMEOUT),
+    )
+    # chart PNGs are only needed for the request; the reports embed them
+    with tempfile.TemporaryDirectory() as tmp:
+        charts = generate_charts(
+            aggregates, output_dir=Path(tmp), cache_dir=_WORKER.get("chart_cache_dir")
+        )
+        return render_reports(build_report_model(insights, charts))
+
+
+class ReportService:
+    def __init__(self, config: ServiceConfig) -> None:
+        self.config = config
+        # running plus queued requests; anything beyond is turned away
+        self._slots = threading.BoundedSemaphore(config.workers + config.queue_size)
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self._in_flight = 0
+        self._pool = self._start_pool()
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        from charts import pool_context
+
+        config = self.config
+        pool = ProcessPoolExecutor(
+            max_workers=config.workers,
+            mp_context=pool_context(),
+            initializer=_warm_worker,
+            initargs=(config.llm, config.llm_timeout, config.llm_cache, config.chart_cache_dir),
+        )
+        # start and warm every worker before the first request arrives
+        warmups = [pool.submit(_ready) for _ in range(config.workers)]
+        pids = {future.result() for future in warmups}
+        print(f"[SERVE] {len(pids)} warm workers ready")
+        return pool
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def status(self) -> Dict[str, object]:
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            "workers": self.config.workers,
+            "queue_size": self.config.queue_size,
+            "in_flight": in_flight,
+            "request_timeout": self.config.request_timeout,
+        }
+
+    def render(self, dataset: Dataset) -> Dict[str, bytes]:
+        if not self._slots.acquire(blocking=False):
+            raise ServiceError(503, "report queue is full")
+        with self._lock:
+            self._in_flight += 1
+        pool = self._pool
+        try:
+            future = pool.submit(_render_dataset, dataset)
+        except BrokenProcessPool:
+            self._release()
+            self._restart_pool(pool)
+            raise ServiceError(503, "worker pool restarted; retry the request")
+        # The slot is held until the worker is done, even after a timeout,
+        # so abandoned requests still count against the concurrency limit.
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.config.request_timeout)
+        except TimeoutError:
+            future.cancel()
+            raise ServiceError(504, f"report not ready after {self.config.request_timeout:g}s")
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            raise ServiceError(500, "report worker crashed")
+        except (KeyError, ValueError) as e:
+            raise ServiceError(400, f"could not read dataset: {e}")
+
+    def _restart_pool(self, broken: ProcessPoolExecutor) -> None:
+        with self._restart_lock:
+            if self._pool is not broken:
+                return  # another request already replaced it
+            print("[WARN] Report worker pool broke; starting a new one")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._start_pool()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _zip_reports(reports: Dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    # PNG-heavy documents barely compress, so they are stored as-is
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for fmt, document in reports.items():
+            archive.writestr(f"{REPORT_NAME}.{fmt}", document)
+    return buffer.getvalue()
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    # GET /health -> service status
+    # POST /reports?format=zip|pdf|pptx with either ?path=<file or folder under
+    # the data root> or the dataset as the request body, named by ?name=<file>.
+    server_version = "InsightForge"
+
+    @property
+    def service(self) -> ReportService:
+        return self.server.service
+
+    def log_message(self, format: str, *args) -> None:
+        print("[SERVE] " + format % args)
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 503:
+            self.send_header("Retry-After", "5")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict[str, object]) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def do_GET(self) -> None:
+        if urlparse(self.path).path == "/health":
+            self._send_json(200, self.service.status())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _local_path(self, requested: str) -> Path:
+        # Relative paths are taken from the data root; after resolving links
+        # and '..', the dataset must still be inside it.
+        root = self.service.config.data_root.resolve()
+        path = (root / requested).resolve()
+        if not path.is_relative_to(root):
+            raise ServiceError(403, f"datasets must be under the service data root: {requested}")
+        if not path.exists():
+            raise ServiceError(404, f"no such dataset: {requested}")
+        return path
+
+    def _dataset(self, query: Dict[str, str]) -> Dataset:
+        if "path" in query:
+            return str(self._local_path(query["path"])), None, None
+        suffix = Path(query.get("name", "upload.csv")).suffix.lower()
+        if suffix not in READERS:
+            raise ServiceError(415, f"unsupported dataset type '{suffix}'")
+        length = self.headers.get("Content-Length")
+        if length is None:
+            raise ServiceError(411, "Content-Length required for uploads")
+        if not length.strip().isdigit():
+            raise ServiceError(400, f"invalid Content-Length: {length!r}")
+        size = int(length)
+        if size > MAX_UPLOAD_BYTES:
+            raise ServiceError(413, f"uploads are limited to {MAX_UPLOAD_BYTES // 1024 ** 2} MB")
+        return None, suffix, self.rfile.read(size)
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        if url.path != "/reports":
+            self._send_json(404, {"error": "not found"})
+            return
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        fmt = query.get("format", "zip")
+        try:
+            if fmt not in CONTENT_TYPES:
+                raise ServiceError(400, f"format must be one of {sorted(CONTENT_TYPES)}")
+            started = time.perf_counter()
+            reports = self.service.render(self._dataset(query))
+            print(f"[SERVE] Rendered {fmt} in {time.perf_counter() - started:.2f}s")
+        except ServiceError as e:
+            self._send_json(e.status, {"error": str(e)})
+            return
+        except Exception as e:
+            print(f"[WARN] Report request failed: {e}")
+            self._send_json(500, {"error": str(e)})
+            return
+        body = _zip_reports(reports) if fmt == "zip" else reports[fmt]
+        self._send(200, body, CONTENT_TYPES[fmt])
+
+
+# socketserver only has Unix servers where the platform has Unix sockets
+if hasattr(socketserver, "UnixStreamServer"):
+
+    class UnixReportServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def server_bind(self) -> None:
+            # a socket left behind by an earlier run would make bind fail
+            if os.path.exists(self.server_address):
+                os.unlink(self.server_address)
+            super().server_bind()
+
+else:
+    UnixReportServer = None
+
+
+class _UnixRequestHandler(ReportRequestHandler):
+    def address_string(self) -> str:
+        # Unix peers have no host address
+        return "unix"
+
+
+def serve(
+    config: ServiceConfig,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: Optional[Path] = None,
+) -> None:
+    if socket_path is not None and UnixReportServer is None:
+        raise ValueError("Unix sockets are not available on this platform; use --host/--port")
+    service = ReportService(config)
+    if socket_path is not None:
+        server = UnixReportServer(str(socket_path), _UnixRequestHandler)
+        where = f"unix:{socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), ReportRequestHandler)
+        where = f"http://{host}:{server.server_port}"
+    server.service = service
+    print(
+        f"[SERVE] Listening on {where} with {config.workers} workers, "
+        f"queue {config.queue_size}, timeout {config.request_timeout:g}s"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[SERVE] Shutting down")
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path is not None and socket_path.exists():
+            socket_path.unlink()
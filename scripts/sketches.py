@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CAPACITY = 10_000
+DEFAULT_PRECISION = 14
+PARTIAL_COLUMNS = ("count", "sum", "sum_sq")
+
+
+def _empty_table() -> pd.DataFrame:
+    return pd.DataFrame(columns=["count", "error", "sum", "sum_sq"], dtype="float64")
+
+
+@dataclass
+class SpaceSaving:
+    # Mergeable Space-Saving summary. `count` over-estimates a key's true
+    # count by at most `error`; `sum`/`sum_sq` cover exactly count - error
+    # rows, so rates derived from them are exact for the rows they cover.
+    capacity: int = DEFAULT_CAPACITY
+    table: pd.DataFrame = field(default_factory=_empty_table)
+    # no key outside the table can have a true count above this
+    floor: float = 0.0
+    total: int = 0
+
+    @classmethod
+    def from_partials(cls, partials: pd.DataFrame, capacity: int = DEFAULT_CAPACITY) -> "SpaceSaving":
+        # partials are exact per-key count (and sum, sum_sq) for one chunk
+        table = pd.DataFrame(index=partials.index)
+        for column in PARTIAL_COLUMNS:
+            table[column] = partials[column].astype("float64") if column in partials else 0.0
+        table.insert(1, "error", 0.0)
+        sketch = cls(capacity, table, 0.0, int(partials["count"].sum()))
+        sketch._truncate()
+        return sketch
+
+    def _truncate(self) -> None:
+        if len(self.table) <= self.capacity:
+            return
+        ordered = self.table.sort_values("count", ascending=False, kind="stable")
+        self.floor = max(self.floor, float(ordered["count"].iloc[self.capacity]))
+        self.table = ordered.iloc[: self.capacity]
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        keys = self.table.index.union(other.table.index, sort=False)
+        left = self.table.reindex(keys)
+        right = other.table.reindex(keys)
+        table = pd.DataFrame(index=keys)
+        # A key missing from one side may have occurred there up to its floor.
+        table["count"] = left["count"].fillna(self.floor) + right["count"].fillna(other.floor)
+        table["error"] = left["error"].fillna(self.floor) + right["error"].fillna(other.floor)
+        for column in ("sum", "sum_sq"):
+            table[column] = left[column].fillna(0.0) + right[column].fillna(0.0)
+        merged = SpaceSaving(
+            min(self.capacity, other.capacity),
+            table,
+            self.floor + other.floor,
+            self.total + other.total,
+        )
+        merged._truncate()
+        return merged
+
+    @property
+    def max_error(self) -> float:
+        # bounded by total / capacity for any sequence of merges
+        return max(self.floor, float(self.table["error"].max()) if len(self.table) else 0.0)
+
+    def partials(self) -> pd.DataFrame:
+        # guaranteed counts, i.e. the rows the sums were collected over
+        table = self.table[list(PARTIAL_COLUMNS)].copy()
+        table["count"] = (self.table["count"] - self.table["error"]).astype("int64")
+        return table
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    # vectorised int.bit_length for uint64
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= np.uint64(1 << shift)
+        values = np.where(high, values >> np.uint64(shift), values)
+        length += high * shift
+    return length + (values > 0)
+
+
+def _hash_values(values: pd.Series) -> np.ndarray:
+    # the same value hashes identically whatever dtype a chunk inferred
+    if pd.api.types.is_bool_dtype(values):
+        values = values.astype("int64")
+    elif pd.api.types.is_integer_dtype(values):
+        values = values.astype("int64")
+    elif pd.api.types.is_float_dtype(values):
+        values = values.astype("float64")
+    elif not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(str)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+@dataclass
+class HyperLogLog:
+    precision: int = DEFAULT_PRECISION
+    registers: Optional[np.ndarray] = None
+
+    def __post_init__(self) -> None:
+        if self.registers is None:
+            self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    @classmethod
+    def from_values(cls, values: pd.Series, precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        sketch = cls(precision)
+        sketch.update(values)
+        return sketch
+
+    def update(self, values: pd.Series) -> None:
+        if values.empty:
+            return
+        hashes = _hash_values(values)
+        rest_bits = 64 - self.precision
+        index = (hashes >> np.uint64(rest_bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        rank = (rest_bits - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLog sketches of different precision")
+        return HyperLogLog(self.precision, np.maximum(self.registers, other.registers))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # linear counting is more accurate while most registers are empty
+            return m * np.log(m / zeros)
+        return float(raw)
@@ -0,0 +1,195 @@
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from aggregates import (
+    GROUP_COLUMNS,
+    METRIC_COLUMN,
+    SEGMENT_COLUMN,
+    DatasetAggregates,
+    group_stats_from_partials,
+    record_bucket_rows,
+)
+from utils import DEFAULT_CHUNKSIZE, quote_identifier, quote_table, sqlite_pool
+
+# Declared-type fragments that give a column numeric affinity in SQLite.
+NUMERIC_TYPES = ("INT", "REAL", "FLOA", "DOUB", "NUM", "DEC", "BOOL")
+
+
+def _is_numeric(declared: str) -> bool:
+    declared = declared.upper()
+    if any(text in declared for text in ("CHAR", "CLOB", "TEXT")):
+        return False
+    return any(fragment in declared for fragment in NUMERIC_TYPES)
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[Tuple[str, bool]]:
+    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    return [(row[1], _is_numeric(row[2] or "")) for row in rows]
+
+
+def _clean_expr(name: str, numeric: bool) -> str:
+    # mirrors clean_data: numeric gaps become 0, text gaps become "N/A"
+    column = quote_identifier(name)
+    if numeric:
+        return f"COALESCE({column}, 0)"
+    return f"COALESCE(CAST({column} AS TEXT), 'N/A')"
+
+
+def iter_sql_chunks(
+    db_path: Union[str, Path], table_name: str, chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[pd.DataFrame]:
+    with sqlite_pool(db_path).connection() as conn:
+        cursor = conn.execute(f"SELECT * FROM {quote_table(conn, table_name)}")
+        columns = [description[0] for description in cursor.description]
+        try:
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    return
+                yield pd.DataFrame.from_records(rows, columns=columns)
+        finally:
+            cursor.close()
+
+
+def load_sql_table(
+    db_path: Union[str, Path], table_name: str, chunksize: int = DEFAULT_CHUNKSIZE
+) -> pd.DataFrame:
+    frames = list(iter_sql_chunks(db_path, table_name, chunksize))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _numbered_extremes(
+    conn: sqlite3.Connection, table: str, value: str, chunksize: int
+) -> List[Tuple[int, float]]:
+    # For tables without a dense rowid: numbers the rows in one window pass.
+    extreme = "SELECT {fn}(value) AS value, pos FROM numbered GROUP BY pos / :chunksize"
+    sql = (
+        f"WITH numbered AS (SELECT ROW_NUMBER() OVER () - 1 AS pos, {value} AS value "
+        f"FROM {table}) SELECT pos, value FROM ({extreme.format(fn='MIN')}) "
+        f"UNION SELECT pos, value FROM ({extreme.format(fn='MAX')}) ORDER BY pos"
+    )
+    return conn.execute(sql, {"chunksize": chunksize}).fetchall()
+
+
+def _numeric_series(
+    conn: sqlite3.Connection, table: str, column: str, chunksize: int, row_count: int
+) -> Optional[pd.Series]:
+    # Only the extremes of each chunk of rows are kept, as in streamed runs.
+    # SQLite finds them with one rowid range scan per chunk, so two rows per
+    # chunk reach Python; a bare rowid next to MIN()/MAX() comes from the row
+    # holding that value.
+    value = _clean_expr(column, True)
+    try:
+        first, last = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table}").fetchone()
+    except sqlite3.OperationalError:  # WITHOUT ROWID tables and views
+        first = last = None
+    # rowid ranges are row positions only when no rowid is missing
+    if first is None or last - first + 1 != row_count:
+        rows = _numbered_extremes(conn, table, value, chunksize)
+    else:
+        points: Dict[int, float] = {}
+        for start in range(first, last + 1, chunksize):
+            for fn in ("MIN", "MAX"):
+                rowid, extreme = conn.execute(
+                    f"SELECT rowid, {fn}({value}) FROM {table} WHERE rowid >= ? AND rowid < ?",
+                    (start, start + chunksize),
+                ).fetchone()
+                if rowid is not None:
+                    points[rowid - first] = extreme
+        rows = sorted(points.items())
+    if not rows:
+        return None
+    positions, values = zip(*rows)
+    return pd.Series(values, index=pd.Index(positions), name=column)
+
+
+def aggregate_table(
+    db_path: Union[str, Path], table_name: str, chunksize: int = DEFAULT_CHUNKSIZE
+) -> Optional[DatasetAggregates]:
+    with sqlite_pool(db_path).connection() as conn:
+        table = quote_table(conn, table_name)
+        columns = _table_columns(conn, table)
+        names = [name for name, _ in columns]
+        numeric = dict(columns)
+        has_activity = METRIC_COLUMN in numeric
+        metric = f"CAST({_clean_expr(METRIC_COLUMN, True)} AS REAL)" if has_activity else "0"
+
+        row_count, activity_sum = conn.execute(
+            f"SELECT COUNT(*), SUM({metric}) FROM {table}"
+        ).fetchone()
+        if not row_count:
+            return None
+        aggregates = DatasetAggregates(row_count=row_count, columns=names)
+        if has_activity:
+            aggregates.activity_rows = row_count
+            aggregates.activity_sum = float(activity_sum or 0.0)
+            aggregates.activity_mean = aggregates.activity_sum / row_count
+
+        date_column = next(
+            (name for name, is_num in columns if "date" in name.lower() and not is_num), None
+        )
+        day = f"date({quote_identifier(date_column)})" if has_activity and date_column else None
+        sums = f", SUM({metric}) AS sum, SUM({metric} * {metric}) AS sum_sq" if has_activity else ""
+
+        # One grouped scan per dimension yields both the overall partials and,
+        # for dated tables, the per-day partials, so pandas never sees raw rows.
+        group_columns = [column for column in GROUP_COLUMNS if column in numeric]
+        per_day: Dict[str, pd.DataFrame] = {}
+        for column in group_columns:
+            key = _clean_expr(column, numeric[column])
+            keys = f"{key} AS value, {day} AS day" if day else f"{key} AS value"
+            partials = pd.read_sql_query(
+                f"SELECT {keys}, COUNT(*) AS count{sums} FROM {table} "
+                f"GROUP BY {'1, 2' if day else '1'} ORDER BY 1",
+                conn,
+            )
+            if day:
+                dated = partials.dropna(subset=["day"])
+                per_day[column] = dated.assign(
+                    value=dated["value"].astype(str), day=pd.to_datetime(dated["day"])
+                ).set_index(["value", "day"])[["count", "sum"]]
+                partials = partials.drop(columns="day").groupby("value", sort=True).sum()
+            else:
+                partials = partials.set_index("value")
+            aggregates.groups[column] = group_stats_from_partials(column, partials)
+
+        if len(group_columns) == len(GROUP_COLUMNS):
+            keys = ", ".join(
+                f"{_clean_expr(column, numeric[column])} AS {quote_identifier(column)}"
+                for column in GROUP_COLUMNS
+            )
+            cube = pd.read_sql_query(
+                f"SELECT {keys}, COUNT(*) AS count{sums} FROM {table} "
+                f"GROUP BY 1, 2 ORDER BY 1, 2",
+                conn,
+            )
+            aggregates.cube = cube.set_index(list(GROUP_COLUMNS))
+
+        if per_day:
+            aggregates.daily = pd.concat(per_day.values(), keys=list(per_day), names=["dimension"])
+        if has_activity and SEGMENT_COLUMN in per_day:
+            aggregates.timeline = per_day[SEGMENT_COLUMN].rename_axis(["segment", "bucket"])
+            aggregates.timeline_kind = "date"
+        elif has_activity and SEGMENT_COLUMN in numeric:
+            segment = _clean_expr(SEGMENT_COLUMN, numeric[SEGMENT_COLUMN])
+            size = record_bucket_rows(row_count)
+            bucket = f"(ROW_NUMBER() OVER () - 1) / {size} * {size}"
+            timeline = pd.read_sql_query(
+                f"SELECT segment, bucket, COUNT(*) AS count, SUM(metric) AS sum FROM ("
+                f"SELECT {segment} AS segment, {bucket} AS bucket, {metric} AS metric "
+                f"FROM {table}) GROUP BY 1, 2 ORDER BY 1, 2",
+                conn,
+            )
+            aggregates.timeline = timeline.set_index(["segment", "bucket"])
+            aggregates.timeline_kind = "record"
+
+        numeric_column = next((name for name, is_num in columns if is_num), None)
+        if numeric_column is not None:
+            aggregates.numeric_column = numeric_column
+            aggregates.numeric_series = _numeric_series(
+                conn, table, numeric_column, chunksize, row_count
+            )
+    return aggregates
@@ -0,0 +1,93 @@
+import argparse
+from pathlib import Path
+from typing import Iterator, Union
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_KEYWORDS = 200
+DEFAULT_CATEGORIES = 12
+DEFAULT_SKEW = 1.1
+DEFAULT_USERS = 100_000
+WRITE_CHUNK = 1_000_000
+
+
+def _zipf_weights(size: int, skew: float) -> np.ndarray:
+    # skew 0 is uniform; larger values concentrate traffic on the first ids
+    weights = 1.0 / np.arange(1, size + 1) ** skew
+    return weights / weights.sum()
+
+
+def iter_synthetic_chunks(
+    rows: int,
+    keywords: int = DEFAULT_KEYWORDS,
+    categories: int = DEFAULT_CATEGORIES,
+    skew: float = DEFAULT_SKEW,
+    users: int = DEFAULT_USERS,
+    seed: int = 7,
+    chunk_rows: int = WRITE_CHUNK,
+) -> Iterator[pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    keyword_names = np.array([f"kw_{idx:06d}" for idx in range(keywords)], dtype=object)
+    category_names = np.array([f"cat_{idx:03d}" for idx in range(categories)], dtype=object)
+    keyword_weights = _zipf_weights(keywords, skew)
+    category_weights = _zipf_weights(categories, skew)
+    # each keyword belongs to one category; each category has its own base rate
+    keyword_category = rng.choice(categories, size=keywords, p=category_weights)
+    category_rate = rng.uniform(0.3, 0.7, size=categories)
+    keyword_lift = rng.normal(0.0, 0.08, size=keywords)
+
+    remaining = rows
+    while remaining > 0:
+        size = min(chunk_rows, remaining)
+        keyword_ids = rng.choice(keywords, size=size, p=keyword_weights)
+        category_ids = keyword_category[keyword_ids]
+        rate = np.clip(category_rate[category_ids] + keyword_lift[keyword_ids], 0.01, 0.99)
+        yield pd.DataFrame(
+            {
+                "user_id": rng.integers(1, users + 1, size=size),
+                "activity": (rng.random(size) < rate).astype(np.int64),
+                "ad_keywords": keyword_names[keyword_ids],
+                "category": category_names[category_ids],
+            }
+        )
+        remaining -= size
+
+
+def generate_dataset(rows: int, **kwargs) -> pd.DataFrame:
+    frames = list(iter_synthetic_chunks(rows, **kwargs))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def write_synthetic_csv(path: Union[str, Path], rows: int, **kwargs) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for idx, chunk in enumerate(iter_synthetic_chunks(rows, **kwargs)):
+        chunk.to_csv(path, mode="w" if idx == 0 else "a", header=idx == 0, index=False)
+    return path
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate synthetic AdTech event data")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--keywords", type=int, default=DEFAULT_KEYWORDS)
+    parser.add_argument("--categories", type=int, default=DEFAULT_CATEGORIES)
+    parser.add_argument("--skew", type=float, default=DEFAULT_SKEW)
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS)
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    out = write_synthetic_csv(
+        args.output,
+        args.rows,
+        keywords=args.keywords,
+        categories=args.categories,
+        skew=args.skew,
+        users=args.users,
+        seed=args.seed,
+    )
+    print(f"[SYNTH] Wrote {args.rows:,} rows to {out}")
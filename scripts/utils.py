@@ -1,74 +1,320 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Union
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import queue
 import sqlite3
+import threading
+import time
 
 import pandas as pd
 
+from formats import iter_excel, iter_ndjson, is_json_lines, read_excel, read_json, read_ndjson
+from schema import CATEGORY_MAX_RATIO, REGISTRY, Schema
 
-def load_csv(folder_path: Union[str, Path]) -> pd.DataFrame:
+
+READERS: Dict[str, Callable[..., pd.DataFrame]] = {
+    ".csv": pd.read_csv,
+    ".xlsx": read_excel,
+    ".json": read_json,
+    ".jsonl": read_ndjson,
+    ".ndjson": read_ndjson,
+}
+
+
+def list_input_files(folder_path: Union[str, Path]) -> List[Path]:
     folder = Path(folder_path)
-    df_list: List[pd.DataFrame] = []
+    files: List[Path] = []
+    for suffix in READERS:
+        files.extend(sorted(folder.glob(f"*{suffix}")))
+    return files
 
-    for file in sorted(folder.glob("*.csv")):
-        try:
-            df_list.append(pd.read_csv(file))
-        except Exception as e:
-            print(f"[WARN] Failed to read CSV {file.name}: {e}")
 
-    return pd.concat(df_list, ignore_index=True) if df_list else pd.DataFrame()
+def read_options(path: Path, schema: Optional[Schema] = None) -> Dict[str, object]:
+    # Explicit dtypes and date columns, so each value is parsed exactly once.
+    # `schema` is the one agreed across sources; it is narrowed to this file.
+    sniffed = REGISTRY.sniff(path)
+    if sniffed is None:
+        return {}
+    if schema is not None:
+        sniffed = schema.restrict(sniffed.kinds)
+    return sniffed.read_options(path.suffix.lower())
 
 
-def load_excel(folder_path: Union[str, Path]) -> pd.DataFrame:
-    folder = Path(folder_path)
-    df_list: List[pd.DataFrame] = []
+def read_file(path: Path, schema: Optional[Schema] = None) -> pd.DataFrame:
+    return READERS[path.suffix.lower()](path, **read_options(path, schema))
+
+
+@dataclass
+class FileResult:
+    path: Path
+    # loaded, empty, skipped (schema conflict) or failed (read error)
+    status: str
+    rows: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass
+class IngestReport:
+    files: List[FileResult] = field(default_factory=list)
+    workers: int = 1
+
+    def with_status(self, *statuses: str) -> List[FileResult]:
+        return [result for result in self.files if result.status in statuses]
+
+    @property
+    def rows(self) -> int:
+        return sum(result.rows for result in self.files)
+
+    def skip(self, rejected: Dict[Path, str]) -> None:
+        for path, reason in rejected.items():
+            self.files.append(FileResult(path, "skipped", error=reason))
 
-    for file in sorted(folder.glob("*.xlsx")):
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "workers": self.workers,
+            "rows": self.rows,
+            "files": [
+                {
+                    "path": str(result.path),
+                    "status": result.status,
+                    "rows": result.rows,
+                    "seconds": round(result.seconds, 4),
+                    "rows_per_s": round(result.rows_per_s),
+                    "error": result.error,
+                }
+                for result in self.files
+            ],
+        }
+
+    def log(self) -> None:
+        loaded = self.with_status("loaded", "empty")
+        print(
+            f"[INGEST] Read {len(loaded)}/{len(self.files)} files ({self.rows:,} rows) "
+            f"with {self.workers} worker(s)"
+        )
+        by_format: Dict[str, List[FileResult]] = {}
+        for result in loaded:
+            by_format.setdefault(result.path.suffix.lower(), []).append(result)
+        for suffix, results in sorted(by_format.items()):
+            rows = sum(result.rows for result in results)
+            seconds = sum(result.seconds for result in results)
+            rate = f", {rows / seconds:,.0f} rows/s" if seconds > 0 else ""
+            print(f"[INGEST]   {suffix:<8} {len(results)} file(s), {rows:,} rows{rate}")
+        for result in self.with_status("skipped", "failed"):
+            print(f"[WARN]   {result.status:<8} {result.path.name}: {result.error}")
+
+
+def read_files(
+    files: Sequence[Path],
+    schema: Optional[Schema] = None,
+    workers: int = 1,
+    loader: Optional[Callable[[Path], pd.DataFrame]] = None,
+) -> Tuple[List[pd.DataFrame], IngestReport]:
+    # Reads the files on a thread pool (pandas' CSV parser releases the GIL while
+    # tokenizing). A file that fails is recorded in the report and the rest load.
+    # Returns the non-empty frames in file order, ready for one concat.
+    load = loader or (lambda path: read_file(path, schema))
+
+    def attempt(path: Path) -> Tuple[Optional[pd.DataFrame], FileResult]:
+        started = time.perf_counter()
         try:
-            df_list.append(pd.read_excel(file))
+            frame = load(path)
         except Exception as e:
-            print(f"[WARN] Failed to read Excel {file.name}: {e}")
+            elapsed = time.perf_counter() - started
+            error = f"{type(e).__name__}: {e}"
+            return None, FileResult(path, "failed", seconds=elapsed, error=error)
+        status = "empty" if frame.empty else "loaded"
+        return frame, FileResult(path, status, len(frame), time.perf_counter() - started)
 
-    return pd.concat(df_list, ignore_index=True) if df_list else pd.DataFrame()
+    workers = max(1, min(workers, len(files)))
+    if workers == 1:
+        outcomes = [attempt(path) for path in files]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as pool:
+            outcomes = list(pool.map(attempt, files))
+    report = IngestReport([result for _, result in outcomes], workers)
+    return [frame for frame, result in outcomes if result.status == "loaded"], report
 
 
-def load_json(folder_path: Union[str, Path]) -> pd.DataFrame:
-    folder = Path(folder_path)
-    df_list: List[pd.DataFrame] = []
+def _load_matching(folder_path: Union[str, Path], pattern: str, workers: int) -> pd.DataFrame:
+    frames, report = read_files(sorted(Path(folder_path).glob(pattern)), workers=workers)
+    report.log()
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def load_csv(folder_path: Union[str, Path], workers: int = 1) -> pd.DataFrame:
+    return _load_matching(folder_path, "*.csv", workers)
+
+
+def load_excel(folder_path: Union[str, Path], workers: int = 1) -> pd.DataFrame:
+    return _load_matching(folder_path, "*.xlsx", workers)
+
+
+def load_json(folder_path: Union[str, Path], workers: int = 1) -> pd.DataFrame:
+    return _load_matching(folder_path, "*.json", workers)
+
+
+DEFAULT_CHUNKSIZE = 100_000
 
-    for file in sorted(folder.glob("*.json")):
+
+def _slice_frame(df: pd.DataFrame, chunksize: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def iter_file_chunks(
+    path: Path, chunksize: int = DEFAULT_CHUNKSIZE, schema: Optional[Schema] = None
+) -> Iterator[pd.DataFrame]:
+    # A read error is raised even after earlier chunks were yielded, so callers
+    # can drop the whole file rather than keep part of it.
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with pd.read_csv(path, chunksize=chunksize, **read_options(path, schema)) as reader:
+            yield from reader
+    elif suffix == ".xlsx":
+        yield from iter_excel(path, chunksize, **read_options(path, schema))
+    elif is_json_lines(path):
+        yield from iter_ndjson(path, chunksize, **read_options(path, schema))
+    else:
+        # pandas cannot stream JSON arrays, so memory is bounded per file.
+        yield from _slice_frame(read_file(path, schema), chunksize)
+
+
+SQLITE_POOL_SIZE = 4
+
+
+class SQLitePool:
+    # Read-only connections are handed out and returned instead of reopened
+    # for every query; extra connections past `size` are closed on release.
+    def __init__(self, db_path: Union[str, Path], size: int = SQLITE_POOL_SIZE) -> None:
+        self.db_path = Path(db_path)
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=size)
+
+    def _open(self) -> sqlite3.Connection:
+        if not self.db_path.exists():
+            raise FileNotFoundError(self.db_path)
+        uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
         try:
-            df_list.append(pd.read_json(file))
-        except Exception as e:
-            print(f"[WARN] Failed to read JSON {file.name}: {e}")
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
 
-    return pd.concat(df_list, ignore_index=True) if df_list else pd.DataFrame()
+
+_SQLITE_POOLS: Dict[Path, SQLitePool] = {}
+_SQLITE_POOLS_LOCK = threading.Lock()
+
+
+def sqlite_pool(db_path: Union[str, Path]) -> SQLitePool:
+    key = Path(db_path).resolve()
+    with _SQLITE_POOLS_LOCK:
+        if key not in _SQLITE_POOLS:
+            _SQLITE_POOLS[key] = SQLitePool(key)
+        return _SQLITE_POOLS[key]
+
+
+def quote_table(conn: sqlite3.Connection, table_name: str) -> str:
+    # Identifiers cannot be bound as parameters, so the name must match an
+    # existing table or view before it is quoted into the statement.
+    row = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?",
+        (table_name,),
+    ).fetchone()
+    if row is None:
+        raise ValueError(f"no such table: {table_name}")
+    return quote_identifier(table_name)
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
 
 
 def load_sqlite(db_path: Union[str, Path], table_name: str) -> pd.DataFrame:
     try:
-        conn = sqlite3.connect(db_path)
-        df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
-        conn.close()
-        return df
+        with sqlite_pool(db_path).connection() as conn:
+            return pd.read_sql_query(f"SELECT * FROM {quote_table(conn, table_name)}", conn)
     except Exception as e:
         print(f"[WARN] Failed to load table {table_name} from {db_path}: {e}")
         return pd.DataFrame()
 
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    cleaned = df.copy()
+def memory_usage_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def _compact_numeric(series: pd.Series) -> pd.Series:
+    if series.hasnans:
+        series = series.fillna(0)
+    if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        return series
+    # Floats stay float64: whole-valued ones would otherwise turn into integers
+    # in some chunks and not others, and float32 would cost precision in sums.
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast="integer")
+    return series
+
+
+def _compact_text(series: pd.Series) -> pd.Series:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if series.hasnans:
+            if "N/A" not in series.cat.categories:
+                series = series.cat.add_categories("N/A")
+            series = series.fillna("N/A")
+        return series
+    if not series.hasnans and pd.api.types.infer_dtype(series, skipna=False) == "boolean":
+        return series.astype(bool)
+    if series.hasnans:
+        series = series.fillna("N/A")
+    if len(series) and series.nunique() <= CATEGORY_MAX_RATIO * len(series):
+        return series.astype("category")
+    return series
+
+
+def clean_data(df: pd.DataFrame, report_memory: bool = False) -> pd.DataFrame:
+    # Columns are replaced rather than mutated, so a shallow copy is enough.
+    cleaned = df.copy(deep=False)
+    before = memory_usage_mb(df) if report_memory else 0.0
 
     for col in cleaned.columns:
         series = cleaned[col]
 
         if pd.api.types.is_numeric_dtype(series):
-            cleaned[col] = series.fillna(0)
-        elif pd.api.types.is_datetime64_any_dtype(series) or "date" in col.lower():
+            cleaned[col] = _compact_numeric(series)
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            continue  # already parsed by the reader
+        elif "date" in col.lower():
             try:
                 cleaned[col] = pd.to_datetime(series, errors="coerce")
             except Exception:
                 pass
         else:
-            cleaned[col] = series.fillna("N/A")
+            cleaned[col] = _compact_text(series)
 
+    if report_memory:
+        after = memory_usage_mb(cleaned)
+        print(f"[CLEAN] Memory {before:.2f} MB -> {after:.2f} MB")
     return cleaned
@@ -0,0 +1,148 @@
+import pickle
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from aggregates import DatasetAggregates, accumulate_aggregates, merge_aggregates
+from cache import file_digest
+from schema import Schema
+from utils import DEFAULT_CHUNKSIZE, clean_data, iter_file_chunks, list_input_files
+
+STATE_PATH = Path("data") / "state" / "watch_state.pkl"
+POLL_INTERVAL = 2.0
+
+FileStat = Tuple[int, int]
+
+
+@dataclass
+class WatchedFile:
+    stat: FileStat
+    digest: str
+    # None for an empty or unreadable file: it is remembered, but adds no data
+    aggregates: Optional[DatasetAggregates]
+
+
+WatchState = Dict[str, WatchedFile]
+
+
+def load_state(path: Path = STATE_PATH) -> WatchState:
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "rb") as handle:
+            return pickle.load(handle)
+    except Exception as e:
+        print(f"[WARN] Ignoring unreadable watch state {path}: {e}")
+        return {}
+
+
+def save_state(state: WatchState, path: Path = STATE_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as handle:
+        pickle.dump(state, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+
+
+def _snapshot(folder: Path) -> Dict[str, FileStat]:
+    snapshot: Dict[str, FileStat] = {}
+    for file in list_input_files(folder):
+        try:
+            info = file.stat()
+        except FileNotFoundError:
+            continue
+        snapshot[str(file)] = (info.st_size, info.st_mtime_ns)
+    return snapshot
+
+
+def aggregate_file(
+    path: Path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    schema: Optional[Schema] = None,
+    sketch_capacity: Optional[int] = None,
+    first_row: int = 0,
+) -> Optional[DatasetAggregates]:
+    # None for a file without rows; a file that fails part-way raises, so its
+    # leading chunks are never mistaken for the whole file.
+    chunks = (clean_data(chunk) for chunk in iter_file_chunks(path, chunksize, schema))
+    return accumulate_aggregates(chunks, sketch_capacity, first_row)
+
+
+def combine_state(state: WatchState) -> Optional[DatasetAggregates]:
+    total: Optional[DatasetAggregates] = None
+    for key in sorted(state):
+        partial = state[key].aggregates
+        if partial is None:
+            continue
+        total = partial if total is None else merge_aggregates(total, partial)
+    return total
+
+
+def sync_state(
+    state: WatchState,
+    snapshot: Dict[str, FileStat],
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> bool:
+    changed = False
+
+    for key in [key for key in state if key not in snapshot]:
+        print(f"[WATCH] Dropping removed file {Path(key).name}")
+        changed |= state.pop(key).aggregates is not None
+
+    for key, stat in snapshot.items():
+        known = state.get(key)
+        if known is not None and known.stat == stat:
+            continue
+        path = Path(key)
+        digest = file_digest(path)
+        if known is not None and known.digest == digest:
+            known.stat = stat
+            continue
+        print(f"[WATCH] Aggregating {'changed' if known else 'new'} file {path.name}")
+        try:
+            partial = aggregate_file(path, chunksize)
+        except Exception as e:
+            # State is left as it was, so the file is read again next poll.
+            print(f"[WARN] Failed to aggregate {path.name}; retrying next poll: {e}")
+            continue
+        if partial is None:
+            print(f"[WATCH] {path.name} has no usable rows; ignoring it until it changes")
+        state[key] = WatchedFile(stat, digest, partial)
+        # a file that neither had nor has data leaves the reports as they are
+        changed |= partial is not None or (known is not None and known.aggregates is not None)
+
+    return changed
+
+
+def watch(
+    folder: Union[str, Path],
+    on_update: Callable[[DatasetAggregates], None],
+    interval: float = POLL_INTERVAL,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    state_path: Path = STATE_PATH,
+) -> None:
+    folder = Path(folder)
+    state = load_state(state_path)
+    previous: Dict[str, FileStat] = {}
+    print(f"[WATCH] Watching {folder} every {interval:g}s ({len(state)} files in state)")
+
+    try:
+        while True:
+            snapshot = _snapshot(folder)
+            # Only files whose size and mtime held still for one full poll are
+            # picked up, so partially copied drops are not read mid-write.
+            stable = {key: stat for key, stat in snapshot.items() if previous.get(key) == stat}
+            pending = set(snapshot) - set(stable)
+            previous = snapshot
+
+            stable_view = dict(stable)
+            stable_view.update({key: state[key].stat for key in pending if key in state})
+            if sync_state(state, stable_view, chunksize):
+                save_state(state, state_path)
+                aggregates = combine_state(state)
+                if aggregates is not None:
+                    on_update(aggregates)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("[WATCH] Stopped")
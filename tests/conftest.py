@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The pipeline modules live as flat scripts, imported the way pipeline.py does.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
@@ -0,0 +1,22 @@
+from schema import SchemaRegistry
+from utils import read_options
+
+HEADER = "user_id,activity,score,category\n"
+
+
+def test_declared_integers_are_read_as_nullable(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(HEADER + "1,0,5,a\n2,1,6,b\n", encoding="utf-8")
+    options = read_options(path)
+    assert options["dtype"]["user_id"] == "Int64"
+    assert options["dtype"]["activity"] == "Int64"
+    # inferred integers keep pandas' own parsing
+    assert "score" not in options["dtype"]
+
+
+def test_declaration_needs_the_sample_to_agree(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(HEADER + "1,0.5,5,a\n2,1.5,6,b\n", encoding="utf-8")
+    _, schema, _ = SchemaRegistry().check([path])
+    assert "activity" not in schema.dtypes()
+    assert schema.dtypes()["user_id"] == "Int64"
@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pytest
+
+from pipeline import _aggregate_files
+from watcher import aggregate_file, sync_state
+
+HEADER = "user_id,activity,ad_keywords,category\n"
+
+
+def _write_rows(path: Path, rows: int, start: int = 0) -> None:
+    with open(path, "a", encoding="utf-8") as handle:
+        for i in range(start, start + rows):
+            handle.write(f"{i},{i % 2},kw{i % 5},c{i % 3}\n")
+
+
+def _broken_csv(path: Path) -> Path:
+    # 10 good rows, then one with an extra field: the reader fails in chunk 2
+    path.write_text(HEADER, encoding="utf-8")
+    _write_rows(path, 10)
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write("10,1,kw0,c1,extra\n")
+    _write_rows(path, 5, start=11)
+    return path
+
+
+def test_failing_file_is_not_aggregated_in_part(tmp_path):
+    broken = _broken_csv(tmp_path / "broken.csv")
+    with pytest.raises(Exception):
+        aggregate_file(broken, chunksize=8)
+
+
+def test_stream_drops_a_file_that_fails_part_way(tmp_path):
+    good = tmp_path / "good.csv"
+    good.write_text(HEADER, encoding="utf-8")
+    _write_rows(good, 20)
+    _broken_csv(tmp_path / "zz_broken.csv")
+
+    aggregates = _aggregate_files(tmp_path, chunksize=8)
+    assert aggregates.row_count == 20
+
+
+def test_watcher_retries_a_file_that_fails_part_way(tmp_path):
+    broken = _broken_csv(tmp_path / "broken.csv")
+    info = broken.stat()
+    snapshot = {str(broken): (info.st_size, info.st_mtime_ns)}
+
+    state = {}
+    assert not sync_state(state, snapshot, chunksize=8)
+    assert state == {}  # nothing recorded, so the next poll reads it again
+
+    broken.write_text(HEADER, encoding="utf-8")
+    _write_rows(broken, 16)
+    info = broken.stat()
+    snapshot = {str(broken): (info.st_size, info.st_mtime_ns)}
+    assert sync_state(state, snapshot, chunksize=8)
+    assert state[str(broken)].aggregates.row_count == 16
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+from aggregates import accumulate_aggregates, build_aggregates
+from pipeline import _aggregate_files
+from utils import clean_data
+
+
+def _undated_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "user_id": np.arange(rows),
+            "activity": rng.integers(0, 2, rows),
+            "ad_keywords": rng.choice(["a", "b", "c"], rows),
+            "category": rng.choice(["x", "y", "z"], rows),
+        }
+    )
+
+
+def _chunks(df: pd.DataFrame, size: int):
+    return (df.iloc[start:start + size].copy() for start in range(0, len(df), size))
+
+
+def test_streamed_record_timeline_matches_unchunked():
+    df = clean_data(_undated_frame(3_000))
+    whole = build_aggregates(df)
+    streamed = accumulate_aggregates(_chunks(df, 700))
+
+    assert whole.timeline_kind == streamed.timeline_kind == "record"
+    pdt.assert_frame_equal(streamed.timeline, whole.timeline, check_dtype=False)
+
+
+def test_streamed_timeline_matches_across_bucket_doublings():
+    # 30,000 rows need 400-row buckets while the first chunks fit 200-row ones
+    df = clean_data(_undated_frame(30_000, seed=1))
+    whole = build_aggregates(df)
+    streamed = accumulate_aggregates(_chunks(df, 4_999))
+
+    pdt.assert_frame_equal(streamed.timeline, whole.timeline, check_dtype=False)
+
+
+def test_streamed_files_continue_record_positions(tmp_path):
+    df = _undated_frame(5_000, seed=2)
+    df.iloc[:2_300].to_csv(tmp_path / "a.csv", index=False)
+    df.iloc[2_300:].to_csv(tmp_path / "b.csv", index=False)
+
+    whole = build_aggregates(clean_data(df))
+    streamed = _aggregate_files(tmp_path, chunksize=700)
+
+    pdt.assert_frame_equal(streamed.timeline, whole.timeline, check_dtype=False)